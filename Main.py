@@ -3,27 +3,32 @@
 # -------------------------
 
 import json
-from click import command
-import simpleaudio as sa
-import speech_recognition as sr
 import webbrowser
-import winsound
 import time
 import os
-import requests
 import musicLibrary
 from dotenv import load_dotenv
-import asyncio
-import edge_tts
-from pydub import AudioSegment
-import io
 import threading
-import pvporcupine
-import pyaudio
-import struct
-import numpy as np
 from difflib import get_close_matches
+from collections import deque
 import re
+import importlib
+import metrics
+import speculation
+import startup
+import titleIndex
+
+# Heavy libraries are imported on first use; the startup tasks at the bottom
+# of this file touch them in parallel (see startup.py).
+requests = startup.lazy_import("requests")
+np = startup.lazy_import("numpy")
+pvporcupine = startup.lazy_import("pvporcupine")
+audioCapture = startup.lazy_import("audioCapture")
+audioOutput = startup.lazy_import("audioOutput")
+voiceActivity = startup.lazy_import("voiceActivity")
+wakeProcess = startup.lazy_import("wakeProcess")
+sttEngine = startup.lazy_import("sttEngine")
+ttsEngine = startup.lazy_import("ttsEngine")
 
 # ------------------------- 
 # MODELS / KEYS
@@ -33,18 +38,35 @@ load_dotenv()
 PICOVOICE_KEY = os.getenv("PICOVOICE_ACCESS_KEY")
 newsapi = os.getenv("NEWSAPI_KEY")
 
-porcupine = pvporcupine.create(
-    access_key=PICOVOICE_KEY,
-    keywords=["jarvis"]
-)
+porcupine = None        # created by the "wake" startup task
 
 # -------------------------
 # SETTINGS
 # -------------------------
 
-recognizer = sr.Recognizer()
-recognizer.energy_threshold = 300
-recognizer.dynamic_energy_threshold = False
+# speech level for the command endpointer until the noise floor has warmed up
+DEFAULT_ENERGY_THRESHOLD = 300
+
+# Barge-in: while Jarvis is talking, a detection only counts if the mic is this
+# many times louder than our own speaker echo is expected to be.
+ECHO_MARGIN = float(os.getenv("JARVIS_ECHO_MARGIN", "2.0"))
+WAKE_KEYWORD = "jarvis"
+
+# Porcupine fires a little after the keyword ends, by which time a one-breath
+# "Jarvis play faded" is already into "play". The command recording starts this
+# far before the detection frame (any "...vis" it picks up is stripped later).
+WAKE_TAIL_SECONDS = float(os.getenv("JARVIS_WAKE_TAIL_MS", "250")) / 1000.0
+
+# Run capture + Porcupine in a separate process, so the main interpreter's
+# GIL (decoding, JSON, ...) can't make the wake loop drop frames.
+WAKE_PROCESS = os.getenv("JARVIS_WAKE_PROCESS", "0") == "1"
+
+# how often to look for edits to musicLibrary.py (seconds)
+LIBRARY_POLL_SECONDS = float(os.getenv("JARVIS_LIBRARY_POLL_SECONDS", "5"))
+
+# Rescore the recognizer's n-best list against what Jarvis can act on
+# (intents, library titles) instead of always taking its top guess
+NBEST_RESCORE = os.getenv("JARVIS_STT_NBEST", "1") == "1"
 
 # -------------------------
 # EVENTS (WAKE-WORD <-> STT CONTROL)
@@ -56,59 +78,199 @@ stt_event = threading.Event()
 wake_event.set()   # wake-word engine starts active
 
 # -------------------------
-# TTS (edge-tts + simpleaudio)  
+# MICROPHONE (one capture stream shared by wake-word and STT)
 # -------------------------
 
-async def speak_async(text):
-    communicate = edge_tts.Communicate(text, "en-US-AriaNeural")
+mic = None      # opened by open_microphone() from the main block
 
-    mp3_bytes = b""
-    async for chunk in communicate.stream():
-        if chunk["type"] == "audio":
-            mp3_bytes += chunk["data"]
+# room noise, tracked from the wake-word frames so the STT threshold is ready
+# the moment a wake occurs
+noise_floor = None
 
-    audio = AudioSegment.from_file(io.BytesIO(mp3_bytes), format="mp3")
+# cheap speech gate in front of Porcupine (JARVIS_WAKE_GATE=0 to run it on every frame)
+wake_gate = None
 
-    raw = audio.raw_data
-    channels = audio.channels
-    sample_width = audio.sample_width
-    frame_rate = audio.frame_rate
+def open_microphone(source=None):
+    """
+    `source(rate, frame_length)` can build a different CaptureSource
+    (e.g. a replayed recording - see replay.py); default is the live mic.
+    """
+    global porcupine, mic, noise_floor, wake_gate
+    if WAKE_PROCESS and source is None:
+        # the child process owns Porcupine; the ring's format comes from it
+        mic = wakeProcess.WakeProcess(PICOVOICE_KEY, [WAKE_KEYWORD])
+    else:
+        porcupine = pvporcupine.create(
+            access_key=PICOVOICE_KEY,
+            keywords=[WAKE_KEYWORD]
+        )
+        if source is not None:
+            mic = source(porcupine.sample_rate, porcupine.frame_length)
+        else:
+            mic = audioCapture.MicrophoneCapture(porcupine.sample_rate, porcupine.frame_length)
+
+    frames_per_second = mic.rate / mic.frame_length
+    noise_floor = voiceActivity.NoiseFloorTracker(frames_per_second)
+    wake_gate = voiceActivity.SpeechGate(frames_per_second)
+    return mic
+
+# ring position of the frame after the wake word; STT reads from just before it
+command_start_frame = 0
 
-    play_obj = sa.play_buffer(raw, channels, sample_width, frame_rate)
-    play_obj.wait_done()
+# -------------------------
+# TTS (edge-tts, streamed to the speaker - see ttsEngine.py)
+# -------------------------
 
-def speak(text):
-    # Run TTS in separate thread so it never blocks wake/STT
-    def _run():
-        asyncio.run(speak_async(text))
-    threading.Thread(target=_run, daemon=True).start()
+# One worker owns the event loop and the output stream; speak() just queues,
+# so replies come out in order instead of overlapping.
+tts_worker = None       # created by the "tts" startup task
+
+def tts_ready(text) -> bool:
+    # a wake can come in before the TTS stack has finished loading
+    try:
+        boot.wait("tts")
+    except Exception:
+        # startup already printed why (e.g. no output device); callers such
+        # as stt_listener's error handlers must keep running regardless
+        print("TTS unavailable, not saying:", repr(text))
+        return False
+    return True
+
+def speak(text, priority=None):
+    if not tts_ready(text):
+        return
+    if priority is None:
+        priority = ttsEngine.PRIORITY_NORMAL
+    tts_worker.say(text, priority)
+
+def speak_sentences(text):
+    # sentence by sentence: the next one is synthesized while this one plays
+    if tts_ready(text):
+        tts_worker.say_sentences(text)
+
+# Every fixed string spoken below - keep in sync so warm-up can pre-render them
+FIXED_RESPONSES = (
+    "Initializing Jarvis",
+    "Let me check that for you.",
+    "I didn't catch that. Please say it again.",
+    "I didn't hear anything.",
+    "I ran into an issue understanding you.",
+    "Couldn't find the song on YouTube, opening search results.",
+    "I ran into an issue searching for the song.",
+    "I could not fetch the news.",
+    "I ran into an issue fetching news.",
+    "Sorry, I had an issue contacting the AI service.",
+)
+
+# Acknowledgement chime: decoded, trimmed and resampled once at startup
+earcons = None          # loaded by the "audio" startup task
+
+# Command capture runs while the chime plays, so mic frames from then (plus
+# this much for output latency and room echo) are treated as silence
+EARCON_ECHO_TAIL_SECONDS = float(os.getenv("JARVIS_EARCON_TAIL_MS", "250")) / 1000.0
+ack_chime = None        # (start, end) in time.monotonic() of the last chime
 
 def speak_yes():
-    winsound.PlaySound("yes.wav", winsound.SND_FILENAME)
+    # async - STT capture doesn't wait for the chime to finish
+    global ack_chime
+    if earcons is None:
+        return
+    voice = earcons.play("yes")
+    if voice is not None:
+        start = time.monotonic()
+        ack_chime = (start, start + voice.fed / voice.output.rate + EARCON_ECHO_TAIL_SECONDS)
+
+def hears_chime(stamp) -> bool:
+    """
+    Endpointer hook: was the mic frame captured at `stamp` taken while the
+    acknowledgement chime (or its echo) was playing?
+    """
+    chime = ack_chime
+    return chime is not None and chime[0] <= stamp <= chime[1]
 
 # -------------------------
-# GOOGLE STT (PURE GSTT)
+# BARGE-IN (wake word interrupts speech + pending actions)
 # -------------------------
 
-def transcribe_google(audio_data):
+# Every wake starts a new turn; background work from an older turn
+# (e.g. a slow AI answer) checks this before speaking.
+turn_lock = threading.Lock()
+turn_id = 0
+
+def begin_turn() -> int:
+    global turn_id
+    with turn_lock:
+        turn_id += 1
+        return turn_id
+
+def current_turn() -> int:
+    return turn_id
+
+def barge_in():
+    """
+    Wake word heard: stop talking right away and abandon the previous turn.
+    """
+    begin_turn()
+    if tts_worker is None:
+        return
+    dropped = tts_worker.cancel()
+    audioOutput.get_output().stop("tts")
+    if dropped:
+        print(f"Barge-in: dropped {dropped} queued utterances")
+
+# Self-trigger suppression: how loud the mic gets per unit of output level
+# while we are speaking. Learned on the fly from the last few seconds.
+ECHO_WINDOW = 16     # ~0.5 s of 32 ms frames, about one keyword
+ECHO_HISTORY = 160   # ~5 s
+recent_levels = deque(maxlen=ECHO_WINDOW)
+echo_ratios = deque(maxlen=ECHO_HISTORY)
+
+def track_echo(mic_rms: float, out_level: float):
+    recent_levels.append((mic_rms, out_level))
+    if out_level > 100:
+        echo_ratios.append(mic_rms / out_level)
+
+def is_self_trigger() -> bool:
     """
-    Uses Google Speech Recognition via speech_recognition.
-    Optimized for Indian English (en-IN).
+    True if a detection right now is probably our own voice from the speaker.
+    """
+    if tts_worker is None:
+        return False
+    output = audioOutput.get_output()
+    if not tts_worker.is_speaking() and not output.is_active("tts"):
+        return False
+
+    spoken = (tts_worker.current_text() or "").lower()
+    if WAKE_KEYWORD in spoken:
+        return True
+
+    if not recent_levels or not echo_ratios:
+        return False
+    # upper quartile, so the user talking over us for a moment doesn't skew it
+    coupling = float(np.percentile(echo_ratios, 75))
+    mic = max(level[0] for level in recent_levels)
+    expected_echo = coupling * max(level[1] for level in recent_levels)
+    return mic < expected_echo * ECHO_MARGIN
+
+# -------------------------
+# STT (Google and/or a local engine - see sttEngine.py)
+# -------------------------
+
+def transcribe(utterance):
     """
+    Recorded command -> lower-case text ("" if nothing usable was heard).
+    JARVIS_STT_BACKEND picks Google, the local engine, or a race of both.
+    """
+    boot.wait("stt")
     try:
-        text = recognizer.recognize_google(audio_data, language="en-IN")
-        text = text.strip().lower()
-        print("Google STT heard:", repr(text))
-        return text
-    except sr.UnknownValueError:
-        print("Google STT: UnknownValueError")
-        return ""
-    except sr.RequestError as e:
-        print("Google STT: API RequestError:", e)
-        return ""
+        result = sttEngine.recognize(utterance.pcm, utterance.rate)
     except Exception as e:
-        print("Google STT: General error:", e)
+        print("STT: all engines failed:", e)
         return ""
+    print(f"STT ({result.engine}) heard:", repr(result.text))
+    if NBEST_RESCORE and len(result.alternatives) > 1:
+        return pick_hypothesis(result.alternatives)
+    return result.text
 
 # -------------------------
 # OPENROUTER AI
@@ -130,7 +292,7 @@ def ask_openrouter(prompt: str) -> str:
     }
 
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=30)
+        response = http_session().post(url, headers=headers, json=payload, timeout=30)
         response.raise_for_status()
         data = response.json()
 
@@ -173,11 +335,19 @@ def fuzzy_contains(command: str, patterns, cutoff: float = 0.7) -> bool:
 # SMARTER MUSIC INTENT + ENTITY EXTRACTION
 # -------------------------
 
-
+YOUTUBE_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/119.0.0.0 Safari/537.36"
+    )
+}
 
 def extract_music_intent(command: str):
     """
-    Detect if the command is about playing music and extract the song/artist.
+    Detect if the command is about playing music (and extract the song/artist)
+    or about the news. Also used on partial transcripts, so it only looks at
+    what has been said so far.
     Returns: (intent:str, entity:str or None)
     """
     command = command.lower()
@@ -191,17 +361,149 @@ def extract_music_intent(command: str):
             entity = command.replace(k, "").strip()
             return "play_music", entity if entity else None
 
+    if re.search(r"\b(news|headlines)\b", command):
+        return "get_news", None
+
     return None, None
 
+_library_index = None
 
+def library_index():
+    """
+    Trigram index of the library titles, rebuilt after musicLibrary.py is reloaded.
+    """
+    global _library_index
+    if _library_index is None or _library_index.source is not musicLibrary.music:
+        _library_index = titleIndex.TitleIndex(musicLibrary.music)
+    return _library_index
+
+def library_match(song_name: str):
+    """
+    (title, url) from the local music library - exact, then fuzzy - or None.
+    """
+    if song_name in musicLibrary.music:
+        return song_name, musicLibrary.music[song_name]
+    match = library_index().lookup(song_name, cutoff=0.45)
+    if match:
+        return match[0], musicLibrary.music[match[0]]
+    return None
+
+def youtube_search_url(song_name: str) -> str:
+    return f"https://www.youtube.com/results?search_query={song_name.replace(' ', '+')}"
+
+def resolve_youtube(song_name: str):
+    """
+    URL of the top YouTube result for song_name, or None. Only searches -
+    safe to run speculatively.
+    """
+    r = http_session().get(youtube_search_url(song_name), headers=YOUTUBE_HEADERS)
+    video_ids = re.findall(r"watch\?v=(\S{11})", r.text)
+    if not video_ids:
+        return None
+    return f"https://www.youtube.com/watch?v={video_ids[0]}&autoplay=1"
+
+def fetch_headlines(count: int = 5):
+    """
+    Top headlines from NewsAPI, or None if the request was refused.
+    """
+    r = http_session().get(f"https://newsapi.org/v2/top-headlines?country=us&apiKey={newsapi.strip()}")
+    if r.status_code != 200:
+        return None
+    articles = r.json().get("articles", [])
+    return [article["title"] for article in articles[:count] if article.get("title")]
+
+# -------------------------
+# SPECULATION FROM PARTIAL TRANSCRIPTS (see speculation.py)
+# -------------------------
+
+def speculate(prefetch, partial: str):
+    """
+    Streaming partial -> start the slow part of the command it looks like.
+    Library hits are instant, so only YouTube searches and headlines are worth it.
+    """
+    intent, entity = extract_music_intent(strip_wake_word(partial))
+    if intent == "play_music" and entity and library_match(entity) is None:
+        prefetch.start(("youtube", entity), resolve_youtube, entity)
+    elif intent == "get_news":
+        prefetch.start(("news",), fetch_headlines)
+
+# -------------------------
+# N-BEST RESCORING (pick the STT alternative that makes a command)
+# -------------------------
+
+# Recognizers rarely say how sure they are of alternatives after the first:
+# assume each is this much less likely than the one before
+NBEST_RANK_DECAY = 0.75
+NBEST_DEFAULT_CONFIDENCE = 0.7
+# alternatives less likely than this are never picked
+NBEST_MIN_PRIOR = 0.35
+# a top guess at least this confident stands, unless it is itself a command
+# (then an alternative may still fix the song title)
+NBEST_TRUST_CONFIDENCE = 0.8
+# how much fitting a command counts against the recognizer's own ranking
+NBEST_COMMAND_WEIGHT = 0.5
+
+def command_fit(text: str) -> float:
+    """
+    0..1: how clearly text is something Jarvis can do. A song in the
+    library scores by how close the title is; news and YouTube searches
+    score a little, so they only break near-ties.
+    """
+    intent, entity = extract_music_intent(text)
+    if intent == "play_music" and entity:
+        match = library_index().lookup(entity, cutoff=0.45)
+        return match[1] if match else 0.2
+    if intent == "get_news":
+        return 0.3
+    return 0.0
+
+def pick_hypothesis(alternatives) -> str:
+    """
+    [(text, confidence or None)] best first -> the text to act on.
+    The top guess is kept unless it is empty (only the wake word), unsure,
+    or itself a command; only then may an alternative that fits a command
+    replace it - e.g. the right library title for a misheard one. A plain
+    question heard with confidence is never swapped for a "play ...".
+    """
+    top_text, top_confidence = strip_wake_word(alternatives[0][0]), alternatives[0][1]
+    top_fit = command_fit(top_text) if top_text else 0.0
+    prior = top_confidence if top_confidence is not None else NBEST_DEFAULT_CONFIDENCE
+    unsure = top_confidence is not None and top_confidence < NBEST_TRUST_CONFIDENCE
+
+    best = (prior + NBEST_COMMAND_WEIGHT * top_fit, 0, top_text) if top_text else None
+    if not top_text or top_fit > 0 or unsure:
+        for rank, (text, confidence) in enumerate(alternatives[1:], start=1):
+            text = strip_wake_word(text)
+            alt_prior = confidence if confidence is not None else prior * NBEST_RANK_DECAY ** rank
+            fit = command_fit(text) if text else 0.0
+            # an alternative has to be a command to beat the recognizer's ranking
+            if fit == 0.0 or alt_prior < NBEST_MIN_PRIOR:
+                continue
+            score = alt_prior + NBEST_COMMAND_WEIGHT * fit
+            if best is None or score > best[0]:
+                best = (score, rank, text)
+
+    if best is None:
+        return ""
+    _, rank, text = best
+    metrics.record("stt.nbest_rank", rank, unit="", quiet=True)
+    if rank > 0:
+        print(f"STT n-best: using alternative #{rank + 1}", repr(text), "over", repr(alternatives[0][0]))
+    return text
 
 # -------------------------
 # UPDATE processCommand() TO USE INTENT
 # -------------------------
 
-def processCommand(command):
+def processCommand(command, prefetch=None):
+    """
+    `prefetch` holds work started from the partial transcripts of this
+    command; results are used only if the final text asks for the same thing.
+    """
     command = command.lower()
     print("Processing command:", repr(command))
+    if prefetch is None:
+        prefetch = speculation.Speculation()
 
     # ----- intent detection -----
     intent, entity = extract_music_intent(command)
@@ -209,51 +511,26 @@ def processCommand(command):
     if intent == "play_music" and entity:
         song_name = entity.lower()
 
-        # 1) Check local library first
-        if song_name in musicLibrary.music:
-            url = musicLibrary.music[song_name]
+        # 1) Check local library first (exact, then fuzzy)
+        match = library_match(song_name)
+        if match:
+            title, url = match
             if "youtube.com/watch" in url and "autoplay=1" not in url:
                 url += "&autoplay=1"
-            speak(f"Playing {song_name}")
+            speak(f"Playing {title}")
             webbrowser.open(url)
             return
 
-        # 2) Fuzzy match local songs
-        all_songs = list(musicLibrary.music.keys())
-        matches = get_close_matches(song_name, all_songs, n=1, cutoff=0.45)
-        matched = matches[0] if matches else None
-        if matched:
-            url = musicLibrary.music[matched]
-            if "youtube.com/watch" in url and "autoplay=1" not in url:
-                url += "&autoplay=1"
-            speak(f"Playing {matched}")
-            webbrowser.open(url)
-            return
-
-        # 3) Fallback: YouTube search
-        search_query = song_name.replace(" ", "+")
-        search_url = f"https://www.youtube.com/results?search_query={search_query}"
-
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/119.0.0.0 Safari/537.36"
-            )
-        }
-
+        # 2) Fallback: YouTube search
         try:
-            r = requests.get(search_url, headers=headers)
-            video_ids = re.findall(r"watch\?v=(\S{11})", r.text)
+            best_url = prefetch.take(("youtube", song_name), resolve_youtube, song_name)
 
-            if video_ids:
-                top_video_id = video_ids[0]
-                best_url = f"https://www.youtube.com/watch?v={top_video_id}&autoplay=1"
+            if best_url:
                 speak(f"Playing {song_name} from YouTube")
                 webbrowser.open(best_url)
             else:
                 speak("Couldn't find the song on YouTube, opening search results.")
-                webbrowser.open(search_url)
+                webbrowser.open(youtube_search_url(song_name))
 
         except Exception as e:
             print("YouTube search error:", e)
@@ -266,53 +543,13 @@ def processCommand(command):
 
     elif intent == "get_news":
         try:
-            r = requests.get(f"https://newsapi.org/v2/top-headlines?country=us&apiKey={newsapi.strip()}")
-            if r.status_code == 200:
-                articles = r.json().get("articles", [])
-                for article in articles[:5]:
-                    title = article.get("title")
-                    if title:
-                        print("•", title)
-                        speak(title)
-                        time.sleep(0.5)
-            else:
+            headlines = prefetch.take(("news",), fetch_headlines)
+            if headlines is None:
                 speak("I could not fetch the news.")
-        except Exception as e:
-            print("News error:", e)
-            speak("I ran into an issue fetching news.")
-
-    elif intent == "unknown":
-        print("\nUnknown command, asking AI...")
-        speak("Let me check that for you.")
-
-        def run_ai():
-            answer = ask_openrouter(f"Answer this clearly and briefly for a voice assistant user: {command}")
-            print("\nAI Result:")
-            print(answer)
-            speak(answer)
-
-        threading.Thread(target=run_ai, daemon=True).start()
-        return
-
-
-
-    elif intent == "open_website" and entity:
-        speak(f"Opening {entity}")
-        webbrowser.open(entity)
-
-    elif intent == "get_news":
-        try:
-            r = requests.get(f"https://newsapi.org/v2/top-headlines?country=us&apiKey={newsapi.strip()}")
-            if r.status_code == 200:
-                articles = r.json().get("articles", [])
-                for article in articles[:5]:
-                    title = article.get("title")
-                    if title:
-                        print("•", title)
-                        speak(title)
-                        time.sleep(0.5)
             else:
-                speak("I could not fetch the news.")
+                for title in headlines:
+                    print("•", title)
+                    speak(title)
         except Exception as e:
             print("News error:", e)
             speak("I ran into an issue fetching news.")
@@ -320,11 +557,16 @@ def processCommand(command):
     else:
         print("\nUnknown command, asking AI...")
         speak("Let me check that for you.")
+        turn = current_turn()
+
         def run_ai():
             answer = ask_openrouter(f"Answer this clearly and briefly for a voice assistant user: {command}")
+            if turn != current_turn():
+                print("\nAI answer arrived after barge-in, dropping it.")
+                return
             print("\nAI Result:")
             print(answer)
-            speak(answer)
+            speak_sentences(answer)
         threading.Thread(target=run_ai, daemon=True).start()
         return
 
@@ -333,47 +575,142 @@ def processCommand(command):
 # WAKE-WORD LISTENER (PORCUPINE)
 # -------------------------
 
+def detect_in_process(reader, rms, zcr) -> bool:
+    if voiceActivity.GATE_ENABLED:
+        threshold = noise_floor.threshold(voiceActivity.GATE_RATIO, voiceActivity.GATE_MIN_ENERGY)
+        feed = wake_gate.update(rms, zcr, threshold)
+    else:
+        feed = 1
+
+    # when the gate opens this includes the look-back frames still in the ring
+    for position in range(reader.position - feed, reader.position):
+        if audioCapture.porcupine_process(porcupine, mic.ring.frame(position)) >= 0:
+            return True
+    return False
+
+def start_command(position):
+    """
+    Hand over to stt_listener, reading the command from ring position
+    `position` (just after the keyword).
+    """
+    global command_start_frame
+    command_start_frame = position
+    stt_event.set()
+
 def wake_word_listener():
-    pa = pyaudio.PyAudio()
-    stream = pa.open(
-        rate=porcupine.sample_rate,
-        channels=1,
-        format=pyaudio.paInt16,
-        input=True,
-        frames_per_buffer=porcupine.frame_length
-    )
+    # PortAudio pushes audio into a preallocated ring from its own thread
+    # (or the wake process does, into shared memory); we read frames back as
+    # NumPy views, so nothing is copied or boxed per frame.
+    mic.start()
+    reader = mic.reader()
 
     print("Wake-word engine running...")
-    time.sleep(2)
+    output = None       # the output device may still be opening
+    frame_seconds = mic.frame_length / mic.rate
+    wake_cpu = metrics.CpuMeter("wake.cpu_per_audio_hour")
+    resumed_at = 0
 
     while True:
-        # Only run when wake_event is set
+        # Only run when wake_event is set (keeps running while Jarvis talks)
         wake_event.wait()
 
-        pcm = stream.read(porcupine.frame_length, exception_on_overflow=False)
-        pcm_frame = struct.unpack_from("h" * porcupine.frame_length, pcm)
+        # the echo / noise bookkeeping needs our output level, so it stays here
+        frame = reader.read()
+        rms, zcr = voiceActivity.frame_features(frame)
+        if output is None and boot.ready("audio"):
+            output = audioOutput.get_output()
+        out_level = output.level() if output is not None else 0.0
+        track_echo(rms, out_level)
+        if out_level == 0.0:
+            # only learn the room while we're silent, not our own echo
+            noise_floor.update(rms)
+
+        if porcupine is None:
+            # Porcupine runs in the wake-word process
+            detected_at = mic.poll_detection(since=resumed_at)
+            detected = detected_at is not None
+        else:
+            detected = detect_in_process(reader, rms, zcr)
+            detected_at = reader.position
+            if wake_cpu.add_audio(frame_seconds) and voiceActivity.GATE_ENABLED:
+                metrics.record("wake.gate_open_pct", wake_gate.duty() * 100.0, unit="%")
+            mic.check_overflows()
+
+        if detected:
+            if is_self_trigger():
+                print("Wake word ignored (our own speech).")
+                continue
 
-        if porcupine.process(pcm_frame) >= 0:
             print("Wake word detected!")
+            barge_in()
             speak_yes()
 
-            # Pause wake-word engine
+            # Pause wake-word engine; the mic keeps running for STT
             wake_event.clear()
-            stream.stop_stream()
 
-            # Trigger STT
-            stt_event.set()
+            # Trigger STT; it reads from the keyword boundary out of the ring,
+            # so the user doesn't have to wait for the chime
+            start_command(detected_at)
 
             # Wait for STT to finish (stt_listener will set wake_event again)
             wake_event.wait()
 
-            # Resume wake-word engine
-            stream.start_stream()
+            # Resume wake-word engine (skip the command audio STT already consumed)
+            reader.skip_to_latest()
+            resumed_at = reader.position
 
 # -------------------------
-# STT LISTENER (PURE GOOGLE STT)
+# STT LISTENER
 # -------------------------
 
+def strip_wake_word(text):
+    """
+    The pre-roll can catch the end of the keyword; drop it from the transcript.
+    """
+    if not text:
+        return text
+    return re.sub(rf"^\W*(hey\s+)?({WAKE_KEYWORD}|vis)\b[\s,.!?]*", "", text, flags=re.I).strip()
+
+def recognize(utterance, stream=None):
+    """
+    Final text for a recorded command: from the streaming session that heard
+    it as it was spoken, or (no streaming / it failed) from the batch engines.
+    """
+    if stream is not None:
+        try:
+            text = stream.finish().strip().lower()
+            print("Streaming STT heard:", repr(text))
+            return text
+        except Exception as e:
+            print("Streaming STT error, falling back to batch STT:", e)
+
+    return transcribe(utterance)
+
+# a partial ending in one of these is waiting for more words
+TRAILING_WORDS = {
+    "play", "hear", "listen", "to", "the", "a", "an", "and", "of", "for", "me",
+    "open", "search", "what", "who", "is", "how", "some", "by",
+}
+
+def partial_looks_complete(partial: str):
+    """
+    Endpointer hook: True if the partial transcript is already a whole
+    command (a library song, the news), False if it stops mid-phrase
+    ("play the ..."), None if it can't tell.
+    """
+    text = strip_wake_word(partial)
+    if not text:
+        return None
+    if text.split()[-1] in TRAILING_WORDS:
+        return False
+    intent, entity = extract_music_intent(text)
+    if intent == "play_music" and entity:
+        match = library_index().lookup(entity, cutoff=0.8)
+        return True if match else None
+    if intent == "get_news":
+        return True
+    return None
+
 def stt_listener():
     while True:
         # Wait until wake-word tells us to start
@@ -381,48 +718,149 @@ def stt_listener():
 
         print("Listening for command...")
 
-        with sr.Microphone() as source:
-            # brief ambient noise adjustment
-            recognizer.adjust_for_ambient_noise(source, duration=0.3)
+        # Same stream the wake word was heard on - no device open, and no
+        # ambient calibration eating the first 300 ms of the command.
+        reader = mic.preroll_reader(command_start_frame, WAKE_TAIL_SECONDS)
+        threshold = noise_floor.threshold() if noise_floor.ready() else DEFAULT_ENERGY_THRESHOLD
+
+        # with a streaming server, recognition runs while the user is talking;
+        # slow lookups start from its partial transcripts, and the endpointer
+        # asks them whether the command sounds finished at each pause
+        prefetch = speculation.Speculation()
+        stream = None
+        looks_complete = None
+        if sttEngine.streaming_enabled():
+            stream = sttEngine.StreamingRecognizer(
+                mic.rate, on_partial=lambda partial: speculate(prefetch, partial)
+            )
+            looks_complete = lambda: partial_looks_complete(stream.text_so_far())
+        endpointer = voiceActivity.Endpointer(mic.rate, mic.frame_length, threshold, looks_complete)
+        try:
+            utterance = endpointer.record(
+                reader, on_audio=stream.feed if stream else None, muted=hears_chime
+            )
 
-            try:
-                # phrase_time_limit to keep it snappy
-                recognizer.pause_threshold = 2
-                audio = recognizer.listen(source)
-                text = transcribe_google(audio)
+            # end of speech -> recognition starting: the hangover plus our own overhead
+            metrics.record("stt.endpoint_latency_ms", utterance.latency_ms())
+            text = strip_wake_word(recognize(utterance, stream))
+            metrics.record("stt.final_text_latency_ms", utterance.latency_ms())
 
-                if not text:
-                    speak("I didn't catch that. Please say it again.")
-                else:
-                    print("Final command text:", repr(text))
-                    processCommand(text)
+            if not text:
+                speak("I didn't catch that. Please say it again.")
+            else:
+                print("Final command text:", repr(text))
+                processCommand(text, prefetch)
+
+        except voiceActivity.NoSpeechTimeout:
+            print("STT: no speech")
+            speak("I didn't hear anything.")
 
-            except sr.WaitTimeoutError:
-                print("STT: WaitTimeoutError")
-                speak("I didn't hear anything.")
+        except Exception as e:
+            print("STT error:", e)
+            speak("I ran into an issue understanding you.")
 
-            except Exception as e:
-                print("STT error:", e)
-                speak("I ran into an issue understanding you.")
+        finally:
+            # a no-op once finish() has returned; otherwise (no speech, an
+            # error, finish() timing out) it closes the websocket and session
+            if stream is not None:
+                stream.cancel()
+
+        prefetch.discard()
 
         # STT finished → allow wake-word to resume
         stt_event.clear()
         wake_event.set()
 
+# -------------------------
+# PHRASE WARM-UP (pre-synthesize fixed replies + library titles)
+# -------------------------
+
+def library_phrases():
+    return [f"Playing {name}" for name in musicLibrary.music]
+
+def warm_phrase_cache():
+    ttsEngine.warm_cache(list(FIXED_RESPONSES) + library_phrases())
+
+def watch_music_library():
+    """
+    Reloads musicLibrary.py when it is edited and pre-renders
+    "Playing {title}" for any new titles.
+    """
+    path = musicLibrary.__file__
+    last_mtime = os.path.getmtime(path)
+    last_titles = set(musicLibrary.music)
+
+    while True:
+        time.sleep(LIBRARY_POLL_SECONDS)
+
+        try:
+            mtime = os.path.getmtime(path)
+            if mtime != last_mtime:
+                last_mtime = mtime
+                importlib.reload(musicLibrary)
+        except Exception as e:
+            # half-saved file etc. - keep the old library until the next edit
+            print("Music library reload error:", e)
+            continue
+
+        titles = set(musicLibrary.music)
+        if titles != last_titles:
+            last_titles = titles
+            print("Music library changed, warming phrase cache...")
+            ttsEngine.warm_cache(library_phrases())
+
 # -------------------------
 # MAIN ENTRY
 # -------------------------
 
-if __name__ == "__main__":
-    # Start background threads
+def start_wake(source=None):
+    open_microphone(source)
     threading.Thread(target=wake_word_listener, daemon=True).start()
-    threading.Thread(target=stt_listener, daemon=True).start()
 
-    speak("Initializing Jarvis")
+def start_audio():
+    global earcons
+    earcons = audioOutput.EarconBank(audioOutput.get_output()).load_defaults()
+
+def start_stt():
+    # loads the local model (if any) alongside everything else
+    sttEngine.default_backend().warm()
+
+def start_tts():
+    global tts_worker
+    tts_worker = ttsEngine.TTSWorker()
+    tts_worker.start()
+
+def start_network():
+    # one keep-alive session for OpenRouter / YouTube / NewsAPI
+    return requests.Session()
+
+def http_session():
+    return boot.wait("network")
+
+# Startup tasks run in parallel; the wake word doesn't wait for TTS or the network.
+boot = startup.Startup()
+
+if __name__ == "__main__":
+    boot.add("wake", start_wake)
+    boot.add("audio", start_audio)
+    boot.add("stt", start_stt)
+    boot.add("tts", start_tts, after=["audio"])
+    boot.add("network", start_network)
+
+    # STT records from the ring as soon as the wake path is up; it only
+    # needs the engines once there is a command to send
+    boot.add("stt_listener", lambda: threading.Thread(target=stt_listener, daemon=True).start(), after=["wake"])
+    boot.add("phrase_warmup", warm_phrase_cache, after=["tts"])
+    threading.Thread(target=watch_music_library, daemon=True).start()
+
+    boot.wait("wake")
     print("Jarvis is ready...")
     print("Say 'Jarvis' to wake me up.")
-    
+    speak("Initializing Jarvis")
+
+    boot.wait_all()
+    boot.report()
 
     # Keep main thread alive
     while True:
-        time.sleep(1)
\ No newline at end of file
+        time.sleep(1)
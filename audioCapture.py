@@ -0,0 +1,451 @@
+# -------------------------
+# AUDIO CAPTURE (callback-driven, preallocated ring buffer)
+# -------------------------
+# PortAudio calls us with each block of microphone audio; we copy it into a
+# preallocated ring of fixed-size int16 frames and move on. Consumers each
+# keep their own read cursor and get frames back as NumPy views into the
+# ring - no per-frame tuples, no per-frame allocations.
+
+import ctypes
+import itertools
+import math
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import startup
+
+pyaudio = startup.lazy_import("pyaudio")     # only opened devices need PortAudio
+
+import audioOutput
+
+# -------------------------
+# SETTINGS
+# -------------------------
+
+# How much audio the ring keeps. Readers that fall further behind than this
+# skip ahead (and it is counted) instead of blocking the microphone.
+RING_SECONDS = float(os.getenv("JARVIS_RING_SECONDS", "4"))
+
+# Pre-roll: how much audio before "now" is always available to a new reader,
+# so the command recorder can start from the wake word itself rather than
+# from whenever it got around to running.
+PREROLL_SECONDS = float(os.getenv("JARVIS_PREROLL_SECONDS", "1.5"))
+
+# readers of a ring written by another process can't be woken, so they poll
+SHARED_POLL_SECONDS = 0.005
+
+# -------------------------
+# FRAME RING
+# -------------------------
+
+class FrameRing:
+    """
+    Single-producer ring of fixed-size int16 frames.
+
+    The producer never takes a lock on the data path: it fills a slot, then
+    publishes it by bumping `head` (total frames ever written). A condition
+    variable is only used to wake readers that are waiting for new frames.
+    """
+
+    def __init__(self, frame_length: int, capacity: int):
+        self.frame_length = frame_length
+        self.capacity = capacity
+        self.frames = np.zeros((capacity, frame_length), dtype=np.int16)
+        self.stamps = np.zeros(capacity, dtype=np.float64)   # time.monotonic() per frame
+        self.head = 0
+        self._fill = 0            # samples already in the slot being written
+        self.waiting = 0          # readers blocked at the head (a replay source paces on this)
+        self._cond = threading.Condition()
+
+    def write(self, pcm, stamp=None):
+        """
+        Append s16le PCM of any length. Producer thread only.
+        """
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        if stamp is None:
+            stamp = time.monotonic()
+
+        published = False
+        while len(samples):
+            slot = self.frames[self.head % self.capacity]
+            take = min(self.frame_length - self._fill, len(samples))
+            slot[self._fill:self._fill + take] = samples[:take]
+            samples = samples[take:]
+            self._fill += take
+            if self._fill == self.frame_length:
+                self.stamps[self.head % self.capacity] = stamp
+                self._fill = 0
+                # publish only after the slot and its stamp are complete
+                self.head += 1
+                published = True
+
+        if published:
+            with self._cond:
+                self.waiting = 0
+                self._cond.notify_all()
+
+    def wait_for(self, position, timeout=None) -> bool:
+        """
+        Block until frame `position` has been written.
+        """
+        if self.head > position:
+            return True
+        with self._cond:
+            if self.head > position:
+                return True
+            self.waiting += 1
+            self._cond.notify_all()
+            if self._cond.wait_for(lambda: self.head > position, timeout):
+                return True
+            self.waiting = max(0, self.waiting - 1)
+            return False
+
+    def wait_for_demand(self, timeout=None) -> bool:
+        """
+        Block until some reader is waiting for a frame that isn't there yet.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self.waiting > 0, timeout)
+
+    def frame(self, position) -> np.ndarray:
+        """
+        View of frame `position` - valid until the ring wraps over it.
+        """
+        return self.frames[position % self.capacity]
+
+    def stamp(self, position) -> float:
+        return self.stamps[position % self.capacity]
+
+    def reader(self, position=None) -> "RingReader":
+        """
+        New cursor, starting at `position` (default: the next frame written).
+        """
+        return RingReader(self, self.head if position is None else position)
+
+
+class SharedFrameRing(FrameRing):
+    """
+    FrameRing living in multiprocessing shared memory, so a capture process
+    can write it and the main process can read it. Create it in one process
+    and attach to it by `name` in the other.
+    """
+
+    def __init__(self, frame_length: int, capacity: int, name=None):
+        create = name is None
+        size = 8 + capacity * 8 + capacity * frame_length * 2
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        buf = self.shm.buf
+
+        self.frame_length = frame_length
+        self.capacity = capacity
+        self._head = np.ndarray((1,), dtype=np.int64, buffer=buf, offset=0)
+        self.stamps = np.ndarray((capacity,), dtype=np.float64, buffer=buf, offset=8)
+        self.frames = np.ndarray((capacity, frame_length), dtype=np.int16, buffer=buf,
+                                 offset=8 + capacity * 8)
+        if create:
+            self._head[0] = 0
+        self._fill = 0
+        self._cond = threading.Condition()
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def head(self) -> int:
+        return int(self._head[0])
+
+    @head.setter
+    def head(self, value: int):
+        self._head[0] = value
+
+    def wait_for(self, position, timeout=None) -> bool:
+        # the writer's notify only reaches readers in its own process;
+        # everyone else re-checks the head every few milliseconds
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.head <= position:
+                wait = SHARED_POLL_SECONDS
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        return False
+                self._cond.wait(wait)
+        return True
+
+    def close(self, unlink=False):
+        # drop our views first, or SharedMemory.close() refuses
+        del self._head, self.stamps, self.frames
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class RingReader:
+    def __init__(self, ring: FrameRing, position: int):
+        self.ring = ring
+        self.position = position
+        self.dropped = 0          # frames skipped because we fell behind
+
+    def read(self, timeout=None):
+        """
+        Next frame as a view into the ring, or None on timeout.
+        """
+        ring = self.ring
+        if not ring.wait_for(self.position, timeout):
+            return None
+
+        oldest = ring.head - ring.capacity + 1
+        if self.position < oldest:
+            self.dropped += oldest - self.position
+            print(f"Capture: reader fell behind, skipped {oldest - self.position} frames")
+            self.position = oldest
+
+        frame = ring.frame(self.position)
+        self.position += 1
+        return frame
+
+    def skip_to_latest(self):
+        self.position = self.ring.head
+
+    def backlog(self) -> int:
+        return self.ring.head - self.position
+
+# -------------------------
+# CAPTURE SOURCES
+# -------------------------
+
+def ring_capacity(rate: int, frame_length: int, ring_seconds=RING_SECONDS) -> int:
+    # keep the pre-roll plus a second of headroom for a slow reader
+    ring_seconds = max(ring_seconds, PREROLL_SECONDS + 1.0)
+    return max(2, math.ceil(ring_seconds * rate / frame_length))
+
+
+class CaptureSource:
+    """
+    Something that fills a FrameRing with audio at `rate` in frames of
+    `frame_length` samples. Readers only ever see the ring.
+    """
+
+    def __init__(self, rate: int, frame_length: int, ring: FrameRing):
+        self.rate = rate
+        self.frame_length = frame_length
+        self.ring = ring
+        self.overflows = 0        # input overflows reported by the device
+        self._overflows_seen = 0
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+    def close(self):
+        self.stop()
+
+    def reader(self, position=None) -> RingReader:
+        return self.ring.reader(position)
+
+    def frames_for(self, seconds: float) -> int:
+        return int(round(seconds * self.rate / self.frame_length))
+
+    def preroll_reader(self, position: int, seconds: float) -> RingReader:
+        """
+        Reader starting `seconds` before ring position `position`, clamped to
+        the pre-roll window.
+        """
+        back = min(self.frames_for(seconds), self.frames_for(PREROLL_SECONDS))
+        return self.ring.reader(max(0, position - back))
+
+    def check_overflows(self) -> int:
+        """
+        Report input overflows since the last call (not from the callback,
+        which must not block on the console).
+        """
+        new = self.overflows - self._overflows_seen
+        if new:
+            self._overflows_seen = self.overflows
+            print(f"Capture: {new} input overflow(s), {self.overflows} total")
+        return new
+
+
+class MicrophoneCapture(CaptureSource):
+    """
+    PyAudio input stream in callback mode, writing into the ring.
+    """
+
+    def __init__(self, rate: int, frame_length: int, ring_seconds=RING_SECONDS, pa=None, ring=None):
+        if ring is None:
+            ring = FrameRing(frame_length, ring_capacity(rate, frame_length, ring_seconds))
+        super().__init__(rate, frame_length, ring)
+        self.pa = pa or audioOutput.get_pyaudio()
+        self.stream = None
+
+    def start(self):
+        if self.stream is None:
+            self.stream = self.pa.open(
+                rate=self.rate,
+                channels=1,
+                format=pyaudio.paInt16,
+                input=True,
+                frames_per_buffer=self.frame_length,
+                stream_callback=self._callback,
+            )
+        self.stream.start_stream()
+        return self
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        self.ring.write(in_data)
+        return None, pyaudio.paContinue
+
+# -------------------------
+# REPLAY SOURCES (wav files, directories, raw PCM on stdin)
+# -------------------------
+
+class ReplaySource(CaptureSource):
+    """
+    Feeds recorded audio through the ring. By default a frame is written
+    only when a reader is waiting for it, so the pipeline runs as fast as
+    the CPU allows and nothing is ever overrun; realtime=True paces it like
+    a microphone instead. Once the recording (and `tail_seconds` of silence)
+    is through, `exhausted` is set and silence keeps coming until stop(), so
+    a command still being recorded can end normally.
+    """
+
+    def __init__(self, rate: int, frame_length: int, chunks, realtime=False, tail_seconds=2.0):
+        super().__init__(rate, frame_length, FrameRing(frame_length, ring_capacity(rate, frame_length)))
+        self.chunks = chunks              # iterable of int16 arrays at `rate`
+        self.realtime = realtime
+        self.tail_seconds = tail_seconds  # silence after the last chunk, so endpointing can finish
+        self.samples_written = 0
+        self.seconds = 0.0                # length of the recording itself, once exhausted
+        self.exhausted = threading.Event()
+        self._stop = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="replay", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop = True
+
+    def _write(self, frame):
+        if self.realtime:
+            due = self._started + (self.samples_written + len(frame)) / self.rate
+            time.sleep(max(0.0, due - time.monotonic()))
+        else:
+            while not self._stop and not self.ring.wait_for_demand(timeout=0.5):
+                pass
+        self.ring.write(frame)
+        self.samples_written += len(frame)
+
+    def _run(self):
+        self._started = time.monotonic()
+        pending = np.zeros(0, dtype=np.int16)
+        tail = np.zeros(int(self.tail_seconds * self.rate), dtype=np.int16)
+        for samples in itertools.chain(self.chunks, [tail]):
+            pending = np.concatenate((pending, samples)) if len(pending) else samples
+            while len(pending) >= self.frame_length and not self._stop:
+                self._write(pending[:self.frame_length])
+                pending = pending[self.frame_length:]
+            if self._stop:
+                return
+        self.seconds = self.samples_written / self.rate
+        self.exhausted.set()
+
+        silence = np.zeros(self.frame_length, dtype=np.int16)
+        while not self._stop:
+            self._write(silence)
+
+
+def wav_chunks(paths, rate, gap_seconds=1.0, starts=None):
+    """
+    Samples of each wav (mono, resampled to `rate`), with silence in between
+    so one recording's command doesn't run into the next one's wake word.
+    If `starts` is a list, (path, seconds into the stream) is appended to it
+    as each file begins.
+    """
+    gap = np.zeros(int(gap_seconds * rate), dtype=np.int16)
+    offset = 0
+    for path in paths:
+        samples, file_rate = audioOutput.load_wav(path)
+        if file_rate != rate:
+            samples = audioOutput.LinearResampler(file_rate, rate).process(samples)
+        print(f"Replay: {path} ({len(samples) / rate:.1f} s)")
+        if starts is not None:
+            starts.append((path, offset / rate))
+        offset += len(samples) + len(gap)
+        yield samples
+        yield gap
+
+
+def wav_paths(target):
+    """
+    A wav file, or every .wav in a directory (sorted).
+    """
+    if os.path.isdir(target):
+        return [
+            os.path.join(target, name) for name in sorted(os.listdir(target))
+            if name.lower().endswith(".wav")
+        ]
+    return [target]
+
+
+def pcm_chunks(stream, block_bytes=8192):
+    """
+    Raw s16le mono PCM from a binary stream (e.g. sys.stdin.buffer), already
+    at the pipeline's rate.
+    """
+    carry = b""
+    while True:
+        data = stream.read(block_bytes)
+        if not data:
+            return
+        data = carry + data
+        usable = len(data) - len(data) % 2
+        carry = data[usable:]
+        yield np.frombuffer(data[:usable], dtype=np.int16)
+
+# -------------------------
+# FRAME HELPERS
+# -------------------------
+
+def porcupine_process(porcupine, frame: np.ndarray) -> int:
+    """
+    porcupine.process() builds a fresh ctypes array out of a Python sequence on
+    every call. Hand the engine a pointer to the ring slot instead; fall back
+    to the public API on pvporcupine versions without these internals.
+    """
+    process_func = getattr(porcupine, "_process_func", None)
+    handle = getattr(porcupine, "_handle", None)
+    if process_func is None or handle is None or not frame.flags.c_contiguous:
+        return porcupine.process(frame)
+
+    result = ctypes.c_int()
+    status = process_func(
+        handle,
+        frame.ctypes.data_as(ctypes.POINTER(ctypes.c_short)),
+        ctypes.byref(result),
+    )
+    if status is not porcupine.PicovoiceStatuses.SUCCESS:
+        # let the public API raise the proper pvporcupine exception
+        return porcupine.process(frame)
+    return result.value
@@ -0,0 +1,398 @@
+# -------------------------
+# AUDIO OUTPUT (one always-open stream + mixer)
+# -------------------------
+# Everything Jarvis plays - TTS, earcons, later local music - goes through a
+# single PyAudio output stream opened once at the device's native rate.
+# Each sound is a Voice: PCM is converted to int16 mono at that rate once,
+# when it is fed, and the stream callback just sums the active voices.
+
+import os
+import threading
+import wave
+from collections import deque
+
+import numpy as np
+import startup
+
+pyaudio = startup.lazy_import("pyaudio")     # only opened devices need PortAudio
+
+# -------------------------
+# SETTINGS
+# -------------------------
+
+# 0 = use the default output device's native rate
+OUTPUT_RATE = int(os.getenv("JARVIS_OUTPUT_RATE", "0"))
+OUTPUT_FRAMES_PER_BUFFER = int(os.getenv("JARVIS_OUTPUT_FRAMES", "512"))
+
+# -------------------------
+# SHARED PYAUDIO INSTANCE
+# -------------------------
+
+_pa = None
+_pa_lock = threading.Lock()
+
+
+def get_pyaudio():
+    """
+    One PyAudio instance for the whole process (capture and playback).
+    """
+    global _pa
+    with _pa_lock:
+        if _pa is None:
+            _pa = pyaudio.PyAudio()
+        return _pa
+
+# -------------------------
+# FORMAT CONVERSION
+# -------------------------
+
+def to_mono_int16(pcm, channels=1) -> np.ndarray:
+    """
+    View s16le bytes as int16 samples (no copy), downmixing if needed.
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    if channels > 1:
+        usable = len(samples) - len(samples) % channels
+        samples = samples[:usable].reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples
+
+
+class LinearResampler:
+    """
+    Streaming linear-interpolation resampler. Keeps the last input sample and
+    the fractional read position between calls, so chunk boundaries are seamless.
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int):
+        self.step = src_rate / dst_rate
+        self._pos = 0.0
+        self._tail = None
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if len(samples) == 0:
+            return samples
+        if self._tail is not None:
+            samples = np.concatenate(([self._tail], samples))
+        last = len(samples) - 1
+        if self._pos > last:
+            # not enough input yet to reach the next output sample
+            self._pos -= last
+            self._tail = samples[-1]
+            return np.zeros(0, dtype=np.int16)
+
+        count = int((last - self._pos) // self.step) + 1
+        positions = self._pos + self.step * np.arange(count)
+        out = np.interp(positions, np.arange(len(samples)), samples)
+
+        # next read position, relative to the sample we keep as the new tail
+        self._pos = positions[-1] + self.step - last
+        self._tail = samples[-1]
+        return out.astype(np.int16)
+
+# -------------------------
+# VOICES
+# -------------------------
+
+class Voice:
+    """
+    One sound source in the mixer: a FIFO of int16 blocks at the output rate.
+    Fed from any thread, drained by the stream callback.
+    """
+
+    def __init__(self, output, rate, channels=1, tag="tts", gain=1.0):
+        self.output = output
+        self.tag = tag
+        self.gain = gain
+        self.channels = channels
+        self._resampler = None if rate == output.rate else LinearResampler(rate, output.rate)
+        self._blocks = deque()
+        self._offset = 0          # read position inside _blocks[0]
+        self.fed = 0              # samples fed so far (output rate)
+        self.played = 0           # samples handed to the device so far
+        self._finished = False
+        self._progress = threading.Condition()
+        self.done = threading.Event()
+
+    def feed(self, pcm) -> int:
+        """
+        Queue PCM (s16le bytes-like at the voice's own rate).
+        Returns the sample position at which this data ends.
+        """
+        samples = to_mono_int16(pcm, self.channels)
+        if self._resampler is not None:
+            samples = self._resampler.process(samples)
+        if len(samples):
+            self._blocks.append(samples)
+            self.fed += len(samples)
+        return self.fed
+
+    def finish(self):
+        """
+        No more data; the voice retires itself once drained.
+        """
+        self._finished = True
+
+    def clear(self):
+        """
+        Drop everything queued but keep the voice open (for a long-lived TTS voice).
+        """
+        with self._progress:
+            self._blocks.clear()
+            self._offset = 0
+            self.played = self.fed
+            self._progress.notify_all()
+
+    def stop(self):
+        self.clear()
+        self._finished = True
+
+    def is_playing(self) -> bool:
+        return self.played < self.fed
+
+    def wait_played(self, position, timeout=None) -> bool:
+        """
+        Block until everything up to `position` has been played.
+        """
+        with self._progress:
+            return self._progress.wait_for(lambda: self.played >= position, timeout)
+
+    def wait(self, timeout=None) -> bool:
+        return self.done.wait(timeout)
+
+    def _mix_into(self, mix: np.ndarray) -> int:
+        """
+        Add up to len(mix) samples into the int32 mix buffer. Callback thread only.
+        """
+        n = len(mix)
+        written = 0
+        with self._progress:
+            while written < n and self._blocks:
+                block = self._blocks[0]
+                take = min(n - written, len(block) - self._offset)
+                chunk = block[self._offset:self._offset + take]
+                if self.gain != 1.0:
+                    mix[written:written + take] += (chunk * self.gain).astype(np.int32)
+                else:
+                    mix[written:written + take] += chunk
+                written += take
+                self._offset += take
+                if self._offset >= len(block):
+                    self._blocks.popleft()
+                    self._offset = 0
+
+            if written:
+                self.played += written
+                self._progress.notify_all()
+        return written
+
+    @property
+    def retired(self) -> bool:
+        return self._finished and not self._blocks
+
+# -------------------------
+# OUTPUT ENGINE
+# -------------------------
+
+class AudioOutput:
+    def __init__(self, rate=OUTPUT_RATE, frames_per_buffer=OUTPUT_FRAMES_PER_BUFFER):
+        self.pa = get_pyaudio()
+        if not rate:
+            rate = int(self.pa.get_default_output_device_info()["defaultSampleRate"])
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+        self._voices = ()           # replaced wholesale, read by the callback without a lock
+        self._lock = threading.Lock()
+        self._mix = np.zeros(frames_per_buffer, dtype=np.int32)
+        self._out = np.zeros(frames_per_buffer, dtype=np.int16)
+        self._power = np.zeros(frames_per_buffer, dtype=np.float32)
+        self._level = 0.0
+        self.stream = None
+
+    def start(self):
+        if self.stream is None:
+            self.stream = self.pa.open(
+                format=pyaudio.paInt16,
+                channels=1,
+                rate=self.rate,
+                output=True,
+                frames_per_buffer=self.frames_per_buffer,
+                stream_callback=self._callback,
+            )
+            self.stream.start_stream()
+        return self
+
+    # ----- voices -----
+
+    def open_voice(self, rate, channels=1, tag="tts", gain=1.0) -> Voice:
+        voice = Voice(self, rate, channels, tag, gain)
+        with self._lock:
+            self._voices = self._voices + (voice,)
+        return voice
+
+    def play(self, pcm, rate, channels=1, tag="earcon", gain=1.0) -> Voice:
+        """
+        Fire-and-forget playback of a complete buffer.
+        """
+        voice = self.open_voice(rate, channels, tag, gain)
+        voice.feed(pcm)
+        voice.finish()
+        return voice
+
+    def stop(self, tag=None):
+        """
+        Silence every voice (or every voice with `tag`) right away.
+        """
+        for voice in self._voices:
+            if tag is None or voice.tag == tag:
+                voice.clear()
+
+    def is_active(self, tag=None) -> bool:
+        return any(
+            voice.is_playing() for voice in self._voices
+            if tag is None or voice.tag == tag
+        )
+
+    def level(self) -> float:
+        """
+        RMS of the most recent output block - how loud we are right now.
+        """
+        return self._level
+
+    # ----- stream callback -----
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        if len(self._mix) < frame_count:
+            self._mix = np.zeros(frame_count, dtype=np.int32)
+            self._out = np.zeros(frame_count, dtype=np.int16)
+            self._power = np.zeros(frame_count, dtype=np.float32)
+        mix = self._mix[:frame_count]
+        mix.fill(0)
+
+        voices = self._voices
+        retired = False
+        for voice in voices:
+            voice._mix_into(mix)
+            if voice.retired:
+                retired = True
+
+        if retired:
+            with self._lock:
+                keep = []
+                for voice in self._voices:
+                    if voice.retired:
+                        voice.done.set()
+                    else:
+                        keep.append(voice)
+                self._voices = tuple(keep)
+
+        np.clip(mix, -32768, 32767, out=mix)
+        out = self._out[:frame_count]
+        np.copyto(out, mix, casting="unsafe")
+
+        power = self._power[:frame_count]
+        np.copyto(power, mix, casting="unsafe")
+        self._level = float(np.sqrt(np.dot(power, power) / max(1, frame_count)))
+
+        # PyAudio wants an immutable bytes object back - the one copy per block
+        return out.tobytes(), pyaudio.paContinue
+
+
+_output = None
+_output_lock = threading.Lock()
+
+
+def get_output() -> AudioOutput:
+    """
+    The process-wide output engine, opened on first use.
+    """
+    global _output
+    with _output_lock:
+        if _output is None:
+            _output = AudioOutput().start()
+        return _output
+
+# -------------------------
+# EARCONS (short UI sounds, decoded once and kept in memory)
+# -------------------------
+
+EARCON_DIR = os.path.dirname(os.path.abspath(__file__))
+EARCON_FILES = {
+    "yes": "Yes.wav",
+}
+
+# anything quieter than this (relative to the peak) at either end is cut off
+EARCON_TRIM_DB = float(os.getenv("JARVIS_EARCON_TRIM_DB", "-40"))
+EARCON_FADE_MS = 5
+
+
+def load_wav(path):
+    """
+    Read a 16-bit PCM wav into (int16 mono samples, rate).
+    """
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit wav is supported")
+        channels = wav.getnchannels()
+        rate = wav.getframerate()
+        pcm = wav.readframes(wav.getnframes())
+    return to_mono_int16(pcm, channels), rate
+
+
+def trim_silence(samples: np.ndarray, threshold_db=EARCON_TRIM_DB) -> np.ndarray:
+    """
+    Slice off leading/trailing samples below `threshold_db` relative to the peak.
+    """
+    if len(samples) == 0:
+        return samples
+    magnitude = np.abs(samples.astype(np.int32))
+    threshold = magnitude.max() * (10.0 ** (threshold_db / 20.0))
+    loud = np.flatnonzero(magnitude > threshold)
+    if len(loud) == 0:
+        return samples[:0]
+    return samples[loud[0]:loud[-1] + 1]
+
+
+class EarconBank:
+    def __init__(self, output=None):
+        self.output = output
+        self._sounds = {}
+
+    def load(self, name, path):
+        """
+        Decode, trim and resample once, so playing is just queueing the array.
+        """
+        if self.output is None:
+            self.output = get_output()
+        samples, rate = load_wav(path)
+        samples = trim_silence(samples)
+        if rate != self.output.rate:
+            samples = LinearResampler(rate, self.output.rate).process(samples)
+
+        # short fades so the trimmed edges don't click
+        fade = min(len(samples) // 2, int(self.output.rate * EARCON_FADE_MS / 1000))
+        if fade:
+            samples = samples.astype(np.float32)
+            ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+            samples[:fade] *= ramp
+            samples[-fade:] *= ramp[::-1]
+            samples = samples.astype(np.int16)
+
+        self._sounds[name] = samples
+        print(f"Earcon {name!r}: {len(samples) / self.output.rate * 1000:.0f} ms")
+
+    def load_defaults(self):
+        for name, filename in EARCON_FILES.items():
+            try:
+                self.load(name, os.path.join(EARCON_DIR, filename))
+            except (OSError, ValueError, wave.Error) as e:
+                print(f"Earcon {name!r} not loaded:", e)
+        return self
+
+    def play(self, name):
+        """
+        Start playing `name` and return at once. Returns the Voice, or None.
+        """
+        samples = self._sounds.get(name)
+        if samples is None:
+            return None
+        return self.output.play(samples, self.output.rate, tag="earcon")
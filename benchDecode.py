@@ -0,0 +1,65 @@
+# -------------------------
+# MICROBENCHMARK: mp3 decode, ffmpeg (pydub) vs in-process (miniaudio)
+# -------------------------
+# Usage:
+#   python benchDecode.py                 # synthesizes a sample phrase with edge-tts
+#   python benchDecode.py reply.mp3 -n 50 # or decode an mp3 you already have
+
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+import ttsEngine
+
+SAMPLE_TEXT = "Let me check that for you. Here is the latest on what you asked about."
+
+
+def bench(name, decode, mp3_bytes, iterations):
+    decode(mp3_bytes)   # warm up (first ffmpeg spawn, miniaudio import, ...)
+
+    timings = []
+    tracemalloc.start()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        pcm = decode(mp3_bytes)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    print(
+        f"{name:<10} mean {statistics.mean(timings):7.2f} ms"
+        f"  p50 {timings[len(timings) // 2]:7.2f} ms"
+        f"  p95 {timings[min(len(timings) - 1, int(len(timings) * 0.95))]:7.2f} ms"
+        f"  py-peak {peak / 1024:8.1f} KiB"
+        f"  pcm {len(pcm) / 1024:8.1f} KiB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare mp3 decode paths used by ttsEngine.")
+    parser.add_argument("mp3", nargs="?", help="mp3 file to decode (default: synthesize a sample)")
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.mp3:
+        with open(args.mp3, "rb") as f:
+            mp3_bytes = f.read()
+    else:
+        mp3_bytes = asyncio.run(ttsEngine._fetch_mp3(SAMPLE_TEXT))
+
+    print(f"mp3: {len(mp3_bytes) / 1024:.1f} KiB, {args.iterations} iterations")
+    try:
+        bench("ffmpeg", ttsEngine.decode_mp3_ffmpeg, mp3_bytes, args.iterations)
+    except Exception as e:
+        print(f"{'ffmpeg':<10} failed: {e}")
+    if ttsEngine.miniaudio is not None:
+        bench("miniaudio", ttsEngine.decode_mp3_miniaudio, mp3_bytes, args.iterations)
+    else:
+        print(f"{'miniaudio':<10} not installed (pip install miniaudio)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+# -------------------------
+# BENCHMARK: wake-word engine (Porcupine, with and without the speech gate)
+# -------------------------
+# Runs every configuration over a corpus of wav files and reports CPU cost
+# per frame, throughput, detection offset against labelled keyword positions
+# and false accepts per hour of background audio.
+#
+# Corpus: a directory of wav files plus an optional labels.csv next to them:
+#   jarvis_test.wav,1.42          <- keyword ends 1.42 s into the file
+#   two_wakes.wav,3.1 9.8         <- several keywords
+#   kitchen_noise.wav,            <- background only (same as not listing it)
+#
+# Usage:
+#   python benchWakeWord.py corpus/
+#   python benchWakeWord.py corpus/ --json results/wake.json --sensitivity 0.6
+
+import argparse
+import csv
+import importlib.metadata
+import json
+import os
+import platform
+import statistics
+import time
+
+import pvporcupine
+from dotenv import load_dotenv
+
+import audioCapture
+import audioOutput
+import voiceActivity
+
+KEYWORD = "jarvis"
+
+# a detection this far before / after a labelled keyword end counts as a hit
+MATCH_BEFORE_SECONDS = 0.5
+MATCH_AFTER_SECONDS = 1.5
+
+
+def load_labels(directory):
+    labels = {}
+    path = os.path.join(directory, "labels.csv")
+    if not os.path.exists(path):
+        return labels
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith("#"):
+                continue
+            times = row[1].split() if len(row) > 1 else []
+            labels[row[0].strip()] = [float(t) for t in times]
+    return labels
+
+
+def load_frames(path, rate, frame_length):
+    samples, file_rate = audioOutput.load_wav(path)
+    if file_rate != rate:
+        samples = audioOutput.LinearResampler(file_rate, rate).process(samples)
+    count = len(samples) // frame_length
+    # rows of a C-contiguous 2-D array, like the capture ring's slots
+    return samples[:count * frame_length].reshape(count, frame_length).copy()
+
+
+def run_file(config, porcupine, frames):
+    """
+    Returns (detection frame indexes, frames the engine ran on, seconds spent).
+    """
+    frames_per_second = porcupine.sample_rate / porcupine.frame_length
+    noise_floor = voiceActivity.NoiseFloorTracker(frames_per_second)
+    gate = voiceActivity.SpeechGate(frames_per_second)
+    detections = []
+    processed = 0
+
+    start = time.perf_counter()
+    for index, frame in enumerate(frames):
+        if config == "gated":
+            rms, zcr = voiceActivity.frame_features(frame)
+            noise_floor.update(rms)
+            threshold = noise_floor.threshold(voiceActivity.GATE_RATIO, voiceActivity.GATE_MIN_ENERGY)
+            feed = gate.update(rms, zcr, threshold)
+        else:
+            feed = 1
+
+        for position in range(index + 1 - feed, index + 1):
+            processed += 1
+            if config == "public_api":
+                result = porcupine.process(frames[position])
+            else:
+                result = audioCapture.porcupine_process(porcupine, frames[position])
+            if result >= 0:
+                detections.append(position)
+                break
+    return detections, processed, time.perf_counter() - start
+
+
+def match(detection_times, keyword_times):
+    """
+    Pairs detections with labelled keywords. Returns (offsets, misses, false accepts).
+    """
+    offsets = []
+    unmatched = list(detection_times)
+    misses = 0
+    for keyword in keyword_times:
+        hit = next(
+            (t for t in unmatched if -MATCH_BEFORE_SECONDS <= t - keyword <= MATCH_AFTER_SECONDS),
+            None,
+        )
+        if hit is None:
+            misses += 1
+        else:
+            unmatched.remove(hit)
+            offsets.append((hit - keyword) * 1000.0)
+    return offsets, misses, len(unmatched)
+
+
+def bench(config, corpus, labels, access_key, sensitivity):
+    total_frames = processed = false_accepts = misses = keywords = 0
+    seconds = background_seconds = 0.0
+    offsets = []
+
+    for path in corpus:
+        porcupine = pvporcupine.create(access_key=access_key, keywords=[KEYWORD], sensitivities=[sensitivity])
+        try:
+            frames = load_frames(path, porcupine.sample_rate, porcupine.frame_length)
+            detected, ran, elapsed = run_file(config, porcupine, frames)
+            frame_seconds = porcupine.frame_length / porcupine.sample_rate
+        finally:
+            porcupine.delete()
+
+        keyword_times = labels.get(os.path.basename(path), [])
+        # detection time = end of the frame it fired on
+        file_offsets, file_misses, file_false = match(
+            [(index + 1) * frame_seconds for index in detected], keyword_times
+        )
+        duration = len(frames) * frame_seconds
+
+        total_frames += len(frames)
+        processed += ran
+        seconds += elapsed
+        offsets += file_offsets
+        misses += file_misses
+        false_accepts += file_false
+        keywords += len(keyword_times)
+        background_seconds += max(0.0, duration - len(keyword_times) * (MATCH_BEFORE_SECONDS + MATCH_AFTER_SECONDS))
+
+    offsets.sort()
+    return {
+        "config": config,
+        "frames": total_frames,
+        "engine_frames": processed,
+        "us_per_frame": seconds / max(1, total_frames) * 1e6,
+        "frames_per_second": total_frames / max(seconds, 1e-9),
+        "keywords": keywords,
+        "detected": keywords - misses,
+        "misses": misses,
+        "offset_ms_mean": statistics.mean(offsets) if offsets else None,
+        "offset_ms_p50": offsets[len(offsets) // 2] if offsets else None,
+        "offset_ms_p95": offsets[min(len(offsets) - 1, int(len(offsets) * 0.95))] if offsets else None,
+        "false_accepts": false_accepts,
+        "background_hours": background_seconds / 3600.0,
+        "false_accepts_per_hour": false_accepts / (background_seconds / 3600.0) if background_seconds else None,
+    }
+
+
+def package_version(name):
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark wake-word detection over a labelled wav corpus.")
+    parser.add_argument("corpus", help="wav file or directory of wav files (with optional labels.csv)")
+    parser.add_argument("--configs", default="public_api,zero_copy,gated",
+                        help="comma-separated: public_api, zero_copy, gated")
+    parser.add_argument("--sensitivity", type=float, default=0.5)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    load_dotenv()
+    access_key = os.getenv("PICOVOICE_ACCESS_KEY")
+    corpus = audioCapture.wav_paths(args.corpus)
+    directory = args.corpus if os.path.isdir(args.corpus) else os.path.dirname(args.corpus) or "."
+    labels = load_labels(directory)
+    print(f"{len(corpus)} files, {sum(len(t) for t in labels.values())} labelled keywords")
+
+    results = []
+    for config in args.configs.split(","):
+        result = bench(config.strip(), corpus, labels, access_key, args.sensitivity)
+        results.append(result)
+        print(
+            f"{result['config']:<11} {result['us_per_frame']:8.1f} us/frame"
+            f"  {result['frames_per_second']:9.0f} frames/s"
+            f"  engine on {result['engine_frames'] / max(1, result['frames']) * 100:5.1f}%"
+            f"  hits {result['detected']}/{result['keywords']}"
+            f"  offset p50 {fmt(result['offset_ms_p50'], '.0f')} ms"
+            f"  FA/h {fmt(result['false_accepts_per_hour'], '.2f')}"
+        )
+
+    if args.json:
+        report = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "pvporcupine": package_version("pvporcupine"),
+            "keyword": KEYWORD,
+            "sensitivity": args.sensitivity,
+            "gate": {
+                "ratio": voiceActivity.GATE_RATIO,
+                "min_energy": voiceActivity.GATE_MIN_ENERGY,
+                "lookback_seconds": voiceActivity.GATE_LOOKBACK_SECONDS,
+            },
+            "corpus": args.corpus,
+            "results": results,
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print("Wrote", args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# -------------------------
+# LATENCY METRICS
+# -------------------------
+# Tiny in-process metrics store so we can compare settings
+# (streaming vs buffered TTS, etc.) from the console output.
+
+import threading
+import time
+from collections import defaultdict, deque
+
+MAX_SAMPLES = 200
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+
+
+def now() -> float:
+    return time.perf_counter()
+
+
+def since_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000.0
+
+
+def record(name: str, value: float, unit: str = "ms", quiet: bool = False):
+    """
+    Store one sample for `name` and print it.
+    """
+    with _lock:
+        _samples[name].append(value)
+    if not quiet:
+        print(f"[metric] {name}: {value:.1f} {unit}")
+
+
+def summary(name: str) -> dict:
+    """
+    Returns count / last / mean / p50 / p95 for a metric, or {} if unseen.
+    """
+    with _lock:
+        values = list(_samples.get(name, ()))
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        "count": len(values),
+        "last": values[-1],
+        "mean": sum(values) / len(values),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+    }
+
+
+def snapshot() -> dict:
+    with _lock:
+        names = list(_samples.keys())
+    return {name: summary(name) for name in names}
+
+
+class CpuMeter:
+    """
+    CPU time spent by the calling thread per hour of audio it processed.
+    Reported (as `name`) every `every` seconds of audio.
+    """
+
+    def __init__(self, name: str, every: float = 300.0):
+        self.name = name
+        self.every = every
+        self._audio = 0.0
+        self._cpu_start = None
+
+    def add_audio(self, seconds: float) -> bool:
+        """
+        Count `seconds` of processed audio. Returns True when it just reported.
+        """
+        if self._cpu_start is None:
+            self._cpu_start = time.thread_time()
+        self._audio += seconds
+        if self._audio < self.every:
+            return False
+
+        cpu = time.thread_time() - self._cpu_start
+        record(self.name, cpu / self._audio * 3600.0, unit="cpu-s per audio hour")
+        self._audio = 0.0
+        self._cpu_start = time.thread_time()
+        return True
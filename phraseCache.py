@@ -0,0 +1,140 @@
+# -------------------------
+# PHRASE CACHE (decoded TTS PCM on disk)
+# -------------------------
+# Content-addressed: the file name is a hash of (text, voice, format), so a
+# phrase synthesized once is played straight from disk next time, with no
+# network round trip and no decode. Entries are memory-mapped on read and the
+# directory is kept under a size budget by evicting the least recently used.
+
+import hashlib
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+# -------------------------
+# SETTINGS
+# -------------------------
+
+CACHE_DIR = os.getenv(
+    "JARVIS_TTS_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache"),
+)
+CACHE_MAX_BYTES = int(float(os.getenv("JARVIS_TTS_CACHE_MB", "64")) * 1024 * 1024)
+
+# Long AI answers are rarely repeated; keep them out so they don't evict the
+# short fixed phrases we actually want to hit.
+CACHE_MAX_CHARS = int(os.getenv("JARVIS_TTS_CACHE_MAX_CHARS", "200"))
+
+SUFFIX = ".pcm"
+
+
+def pcm_format(frame_rate: int, channels: int, sample_width: int) -> str:
+    """
+    Format tag used in the cache key, e.g. 's16le-24000-1'.
+    """
+    return f"s{sample_width * 8}le-{frame_rate}-{channels}"
+
+
+def phrase_key(text: str, voice: str, fmt: str) -> str:
+    text = " ".join(text.split())
+    return hashlib.sha256(f"{voice}\x1f{fmt}\x1f{text}".encode("utf-8")).hexdigest()
+
+
+class PhraseCache:
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> size, least recently used first
+        self._total = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def _scan(self):
+        """
+        Rebuild the LRU order from file mtimes (touched on every hit).
+        """
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            found.append((st.st_mtime, name[: -len(SUFFIX)], st.st_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+
+    def cacheable(self, text: str) -> bool:
+        return bool(text) and len(text) <= CACHE_MAX_CHARS
+
+    def contains(self, text: str, voice: str, fmt: str) -> bool:
+        with self._lock:
+            return phrase_key(text, voice, fmt) in self._entries
+
+    def get(self, text: str, voice: str, fmt: str):
+        """
+        Returns a read-only mmap of the PCM, or None on a miss.
+        """
+        key = phrase_key(text, voice, fmt)
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                pcm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            print("Phrase cache read error:", e)
+            self._forget(key)
+            return None
+        return pcm
+
+    def put(self, text: str, voice: str, fmt: str, pcm):
+        if not self.cacheable(text) or not pcm:
+            return
+        key = phrase_key(text, voice, fmt)
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp, path)
+        except OSError as e:
+            print("Phrase cache write error:", e)
+            return
+
+        size = len(pcm)
+        with self._lock:
+            self._total += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+        self._evict()
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._total -= self._entries.pop(key, 0)
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self._total <= self.max_bytes or len(self._entries) <= 1:
+                    return
+                key, size = self._entries.popitem(last=False)
+                self._total -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                # Windows refuses to delete a file that is still mapped;
+                # it just stays on disk until the next scan.
+                pass
@@ -0,0 +1,142 @@
+# -------------------------
+# REPLAY: recorded audio through the wake-word -> endpointing -> STT pipeline
+# -------------------------
+# Usage:
+#   python replay.py jarvis_test.wav              # one recording
+#   python replay.py recordings/                  # every .wav in a directory
+#   arecord -q -f S16_LE -r 16000 -c 1 | python replay.py -   # raw PCM on stdin
+#
+# Audio is fed only as fast as the pipeline reads it, so an hour of
+# recordings runs in however long the CPU needs (--realtime to pace it like
+# a microphone). By default commands and replies are printed, not acted on;
+# --actions runs processCommand with TTS, the output device and the network.
+#
+# Latencies are reported in audio time plus measured processing time, so
+# they mean the same at any replay speed. With a labels.csv next to the
+# recordings (see benchWakeWord.py) the wake-word detection offset is
+# reported too.
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import audioCapture
+import benchWakeWord
+import Main
+import metrics
+
+
+def detection_offsets(labels, starts, detections):
+    """
+    Matches detections (seconds into the replay) against each file's
+    labelled keywords. Returns (offsets in ms, labelled keywords, misses,
+    false accepts).
+    """
+    offsets, keywords, misses, false_accepts = [], 0, 0, 0
+    ends = [start for _, start in starts[1:]] + [float("inf")]
+    for (path, start), end in zip(starts, ends):
+        keyword_times = labels.get(os.path.basename(path), [])
+        heard = [t - start for t in detections if start <= t < end]
+        file_offsets, file_misses, file_false = benchWakeWord.match(heard, keyword_times)
+        offsets += file_offsets
+        keywords += len(keyword_times)
+        misses += file_misses
+        false_accepts += file_false
+    return offsets, keywords, misses, false_accepts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recordings through Jarvis' voice pipeline.")
+    parser.add_argument("input", help="wav file, directory of wav files, or - for s16le PCM on stdin")
+    parser.add_argument("--realtime", action="store_true", help="pace the audio like a live microphone")
+    parser.add_argument("--stt", choices=["auto", "google", "local", "race", "none"], default="auto",
+                        help="STT engine(s) to use, or none to only report command length")
+    parser.add_argument("--actions", action="store_true", help="run processCommand and speak replies")
+    args = parser.parse_args()
+
+    starts = []         # (path, seconds into the replay) of each file
+    detections = []     # seconds into the replay of each accepted keyword
+
+    def source(rate, frame_length):
+        if args.input == "-":
+            print(f"Replay: stdin (s16le mono {rate} Hz)")
+            chunks = audioCapture.pcm_chunks(sys.stdin.buffer)
+        else:
+            chunks = audioCapture.wav_chunks(audioCapture.wav_paths(args.input), rate, starts=starts)
+        return audioCapture.ReplaySource(rate, frame_length, chunks, realtime=args.realtime)
+
+    commands = []
+    if args.stt == "none":
+        def transcribe(utterance):
+            print(f"Replay: command audio {utterance.seconds:.2f} s (not transcribed)")
+            return ""
+        Main.transcribe = transcribe
+    else:
+        Main.sttEngine.STT_BACKEND = args.stt
+
+    if args.actions:
+        run_command = Main.processCommand
+
+        def process(text, prefetch=None):
+            commands.append(text)
+            run_command(text, prefetch)
+
+        Main.boot.add("audio", Main.start_audio)
+        Main.boot.add("tts", Main.start_tts, after=["audio"])
+        Main.boot.add("network", Main.start_network)
+    else:
+        def process(text, prefetch=None):
+            commands.append(text)
+            print("Replay: command ->", repr(text))
+
+        Main.speak = lambda text, priority=None: print("Replay: would say", repr(text))
+    Main.processCommand = process
+
+    start_command = Main.start_command
+
+    def on_wake(position):
+        # the ring position is just after the keyword; the replay starts at 0
+        detections.append(position * Main.mic.frame_length / Main.mic.rate)
+        start_command(position)
+
+    Main.start_command = on_wake
+
+    started = time.perf_counter()
+    Main.boot.add("wake", lambda: Main.start_wake(source))
+    Main.boot.add("stt", Main.start_stt)
+    Main.boot.wait("wake")
+    threading.Thread(target=Main.stt_listener, daemon=True).start()
+
+    # done once the recording has been consumed and no command is in flight
+    Main.mic.exhausted.wait()
+    settled = 0
+    while settled < 3:
+        time.sleep(0.05)
+        settled = settled + 1 if not Main.stt_event.is_set() else 0
+    Main.mic.stop()
+    if args.actions:
+        Main.tts_worker.wait_idle()
+
+    wall = time.perf_counter() - started
+    audio = Main.mic.seconds
+    print()
+    print(f"Replayed {audio:.1f} s of audio in {wall:.2f} s ({audio / max(wall, 1e-9):.1f}x real time)")
+    print(f"Commands: {len(commands)}")
+    directory = args.input if os.path.isdir(args.input) else os.path.dirname(args.input) or "."
+    labels = benchWakeWord.load_labels(directory) if starts else {}
+    if labels:
+        offsets, keywords, misses, false_accepts = detection_offsets(labels, starts, detections)
+        for offset in offsets:
+            metrics.record("wake.detect_offset_ms", offset, quiet=True)
+        print(f"Wake word: {keywords - misses}/{keywords} labelled keywords heard, {false_accepts} false accepts")
+    for name, stats in sorted(metrics.snapshot().items()):
+        print(f"  {name}: n={stats['count']} mean={stats['mean']:.1f} p95={stats['p95']:.1f}")
+    if args.stt != "none":
+        for name, stats in Main.sttEngine.engine_report().items():
+            print(f"  stt engine {name}: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# -------------------------
+# SPECULATIVE WORK (started from partial transcripts)
+# -------------------------
+# With a streaming recognizer the intent of "play ..." / "news" commands is
+# usually clear a second or more before the final transcript. Main.py starts
+# the slow, side-effect-free part of the command (YouTube search, headline
+# fetch) from the partials; when the final text lands processCommand takes
+# the result it needs and everything else is dropped. Nothing the user can
+# see or hear happens until the final text has been checked.
+
+import concurrent.futures
+import threading
+import time
+
+import metrics
+
+MAX_WORKERS = 2
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=MAX_WORKERS, thread_name_prefix="speculate"
+            )
+        return _pool
+
+
+class Speculation:
+    """
+    Jobs for one command, keyed like ("youtube", "faded"). A newer job of the
+    same kind cancels older ones that have not started yet, so a partial that
+    is still growing doesn't queue a search per word.
+    """
+
+    def __init__(self):
+        self._jobs = {}           # key -> (future, started_at)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.used = 0
+
+    def start(self, key, fn, *args):
+        with self._lock:
+            if self._closed or key in self._jobs:
+                return
+            for other, (future, _) in list(self._jobs.items()):
+                if other[0] == key[0] and future.cancel():
+                    del self._jobs[other]
+            print("Speculating:", key)
+            self._jobs[key] = (_get_pool().submit(fn, *args), time.monotonic())
+
+    def take(self, key, fn, *args):
+        """
+        Result of `fn(*args)`: from the speculative job for `key` if one was
+        started, otherwise computed now. Errors are raised either way.
+        """
+        with self._lock:
+            job = self._jobs.pop(key, None)
+        if job is None or job[0].cancelled():
+            return fn(*args)
+
+        future, started_at = job
+        head_start = time.monotonic() - started_at
+        result = future.result()
+        self.used += 1
+        metrics.record("speculation.head_start_ms", head_start * 1000.0)
+        return result
+
+    def discard(self):
+        """
+        Drop whatever the final command didn't use. Running jobs finish in the
+        background; their results are ignored.
+        """
+        with self._lock:
+            self._closed = True
+            jobs, self._jobs = self._jobs, {}
+        for future, _ in jobs.values():
+            future.cancel()
+        if jobs or self.used:
+            print(f"Speculation: {self.used} used, {len(jobs)} discarded")
@@ -0,0 +1,125 @@
+# -------------------------
+# STARTUP (lazy imports + parallel init, with a timeline)
+# -------------------------
+# Main.py used to import every heavy library and create Porcupine at import
+# time, one after the other. Now heavy modules are imported on first use,
+# and the subsystems are brought up as parallel tasks so the wake word is
+# live before the TTS / network stacks have finished loading. Every import
+# and task is timed and printed as a timeline once startup settles.
+
+import concurrent.futures
+import importlib
+import threading
+import time
+
+T0 = time.perf_counter()
+
+_timeline = []            # (name, start_ms, end_ms, ok)
+_timeline_lock = threading.Lock()
+
+
+def _ms() -> float:
+    return (time.perf_counter() - T0) * 1000.0
+
+
+def record_span(name: str, start_ms: float, end_ms: float, ok: bool = True):
+    with _timeline_lock:
+        _timeline.append((name, start_ms, end_ms, ok))
+
+# -------------------------
+# LAZY IMPORTS
+# -------------------------
+
+class LazyModule:
+    """
+    Stands in for a module and imports it the first time an attribute is
+    used. Unlike importlib.util.LazyLoader this is safe to touch from several
+    startup threads at once.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                start = _ms()
+                self._module = importlib.import_module(self._name)
+                record_span(f"import {self._name}", start, _ms())
+        return self._module
+
+    def __getattr__(self, attr):
+        module = self._module or self._load()
+        return getattr(module, attr)
+
+    def __setattr__(self, attr, value):
+        if attr.startswith("_"):
+            object.__setattr__(self, attr, value)
+        else:
+            # e.g. replay.py overriding a setting: it has to land on the
+            # module, whose own functions read their globals from there
+            setattr(self._module or self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+# -------------------------
+# ORCHESTRATOR
+# -------------------------
+
+class Startup:
+    def __init__(self, max_workers=6):
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="startup"
+        )
+        self._tasks = {}
+
+    def add(self, name: str, fn, after=()):
+        """
+        Run `fn()` in the background once every task named in `after` is done.
+        """
+        deps = [self._tasks[dep] for dep in after]
+
+        def run():
+            for dep in deps:
+                dep.result()
+            start = _ms()
+            try:
+                result = fn()
+            except Exception as e:
+                record_span(name, start, _ms(), ok=False)
+                print(f"Startup: {name} failed:", e)
+                raise
+            record_span(name, start, _ms())
+            return result
+
+        self._tasks[name] = self._pool.submit(run)
+        return self._tasks[name]
+
+    def wait(self, name: str, timeout=None):
+        """
+        Block until task `name` is done; returns its result or raises its error.
+        """
+        return self._tasks[name].result(timeout)
+
+    def ready(self, name: str) -> bool:
+        task = self._tasks.get(name)
+        return task is not None and task.done() and task.exception() is None
+
+    def wait_all(self, timeout=None):
+        concurrent.futures.wait(list(self._tasks.values()), timeout)
+
+    def report(self):
+        with _timeline_lock:
+            spans = sorted(_timeline, key=lambda span: span[1])
+        print("Startup timeline (ms since launch):")
+        for name, start, end, ok in spans:
+            flag = "" if ok else "  FAILED"
+            print(f"  {start:7.0f} -> {end:7.0f}  ({end - start:6.0f})  {name}{flag}")
@@ -0,0 +1,464 @@
+# -------------------------
+# STT ENGINE (batch engines, racing, and streaming recognition)
+# -------------------------
+# Batch: a recorded command goes to one or more STTBackends - Google over the
+# network and/or a CPU-only local engine (vosk) - and, in race mode, the
+# first confident answer wins.
+#
+# Streaming: the command recorder hands every captured chunk to a StreamingRecognizer,
+# which forwards it over a websocket as it arrives and collects partial and
+# final hypotheses on the way. By the time the endpointer decides the user
+# has stopped, the server has already heard everything but the last few
+# hundred milliseconds, so the final text is one round trip away.
+#
+# The wire protocol is vosk-server's (binary PCM frames in, JSON
+# {"partial": ...} / {"text": ...} out, {"eof": 1} to finish), so this talks
+# to a real vosk-server as well as to the offline stand-in in sttServer.py.
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import threading
+import time
+
+import aiohttp
+import numpy as np
+import speech_recognition as sr
+
+try:
+    import vosk        # optional: offline recognition on the CPU
+except ImportError:
+    vosk = None
+
+import flacEncode
+import metrics
+
+# -------------------------
+# SETTINGS
+# -------------------------
+
+# e.g. ws://localhost:2700 - empty means no streaming, record then transcribe
+STREAM_URL = os.getenv("JARVIS_STT_STREAM_URL", "")
+STREAM_CONNECT_TIMEOUT = float(os.getenv("JARVIS_STT_CONNECT_TIMEOUT", "2"))
+STREAM_FINAL_TIMEOUT = float(os.getenv("JARVIS_STT_FINAL_TIMEOUT", "5"))
+
+# google | local | race | auto (race when a local model is configured, else google)
+STT_BACKEND = os.getenv("JARVIS_STT_BACKEND", "auto")
+GOOGLE_LANGUAGE = os.getenv("JARVIS_STT_LANGUAGE", "en-IN")
+GOOGLE_TIMEOUT = float(os.getenv("JARVIS_STT_GOOGLE_TIMEOUT", "8"))
+# 1 = encode the upload with flacEncode; 0 = speech_recognition's flac binary
+IN_PROCESS_FLAC = os.getenv("JARVIS_STT_INPROCESS_FLAC", "1") == "1"
+
+# directory of a vosk model, e.g. vosk-model-small-en-in-0.4
+LOCAL_STT_MODEL = os.getenv("JARVIS_VOSK_MODEL", "")
+
+# race mode: an answer at least this confident wins as soon as it arrives;
+# otherwise we wait for the rest and take the most confident non-empty one
+RACE_MIN_CONFIDENCE = float(os.getenv("JARVIS_STT_MIN_CONFIDENCE", "0.6"))
+RACE_TIMEOUT = float(os.getenv("JARVIS_STT_RACE_TIMEOUT", "10"))
+
+# -------------------------
+# BATCH ENGINES
+# -------------------------
+
+class STTResult:
+    def __init__(self, text, confidence, engine, latency_ms, raw=None, alternatives=None):
+        self.text = text
+        self.confidence = confidence    # 0..1, None if the engine doesn't say
+        self.engine = engine
+        self.latency_ms = latency_ms
+        self.raw = raw                  # engine's own response, for debugging
+        # n-best [(text, confidence or None)], best first; text is always the first
+        if alternatives is None:
+            alternatives = [(text, confidence)] if text else []
+        self.alternatives = alternatives
+
+    def __repr__(self):
+        return f"STTResult({self.text!r}, confidence={self.confidence}, engine={self.engine!r})"
+
+
+class STTBackend:
+    """
+    A recognizer: a whole utterance of s16le mono PCM in, an STTResult out.
+    `recognize` is blocking and may be called from several threads at once.
+    """
+
+    name = "base"
+
+    def available(self) -> bool:
+        return True
+
+    def warm(self):
+        """
+        Load whatever is slow to load (models, sessions) ahead of the first command.
+        """
+
+    def transcribe(self, pcm, rate):
+        """
+        Returns (text, confidence, raw).
+        """
+        raise NotImplementedError
+
+    def alternatives(self, raw):
+        """
+        N-best [(text, confidence or None)] from the engine's response, or
+        None if the engine only gives one hypothesis.
+        """
+        return None
+
+    def recognize(self, pcm, rate) -> STTResult:
+        stats = stats_for(self)
+        start = time.perf_counter()
+        try:
+            text, confidence, raw = self.transcribe(pcm, rate)
+        except Exception as e:
+            stats.record_failure()
+            print(f"STT {self.name} error:", e)
+            raise
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        text = (text or "").strip().lower()
+        stats.record(latency_ms, bool(text))
+        metrics.record(f"stt.latency_ms.{self.name}", latency_ms, quiet=True)
+        alternatives = self.alternatives(raw) if text else None
+        return STTResult(text, confidence, self.name, latency_ms, raw, alternatives)
+
+
+class InProcessFlacAudio(sr.AudioData):
+    """
+    AudioData whose FLAC conversion (what recognize_google uploads) runs in
+    this process instead of piping the audio through the flac binary.
+    """
+
+    def get_flac_data(self, convert_rate=None, convert_width=None):
+        start = time.perf_counter()
+        try:
+            samples = np.frombuffer(self.get_raw_data(convert_rate, 2), dtype=np.int16)
+            data = flacEncode.encode(samples, convert_rate or self.sample_rate)
+        except Exception as e:
+            print("In-process FLAC failed, using the flac binary:", e)
+            return super().get_flac_data(convert_rate, convert_width)
+
+        encode_ms = (time.perf_counter() - start) * 1000.0
+        metrics.record("stt.flac_encode_ms", encode_ms, quiet=True)
+        metrics.record("stt.upload_kb", len(data) / 1024.0, unit="KB", quiet=True)
+        print(f"STT upload: {len(data) / 1024.0:.1f} KB FLAC "
+              f"({len(data) / max(1, len(samples) * 2):.0%} of raw), encoded in {encode_ms:.1f} ms")
+        return data
+
+
+class GoogleSTTBackend(STTBackend):
+    name = "google"
+
+    def __init__(self, language=GOOGLE_LANGUAGE):
+        self.language = language
+        self.recognizer = sr.Recognizer()
+        self.recognizer.operation_timeout = GOOGLE_TIMEOUT
+
+    def transcribe(self, pcm, rate):
+        # mono already; anything above 16 kHz is just more bytes to upload
+        samples, rate = flacEncode.downsample(np.frombuffer(pcm, dtype=np.int16), rate)
+        audio_type = InProcessFlacAudio if IN_PROCESS_FLAC else sr.AudioData
+        audio = audio_type(samples.tobytes(), rate, 2)
+        try:
+            # show_all: the raw response, which carries the confidence
+            raw = self.recognizer.recognize_google(audio, language=self.language, show_all=True)
+        except sr.UnknownValueError:
+            return "", 0.0, None
+        if not raw or not raw.get("alternative"):
+            return "", 0.0, raw
+        best = raw["alternative"][0]
+        return best.get("transcript", ""), best.get("confidence"), raw
+
+    def alternatives(self, raw):
+        # only the first alternative usually carries a confidence
+        return [
+            (alt["transcript"].strip().lower(), alt.get("confidence"))
+            for alt in raw["alternative"] if alt.get("transcript")
+        ]
+
+
+class VoskSTTBackend(STTBackend):
+    """
+    Offline, CPU-only. The model is loaded once (warm() at startup, or on
+    first use); each utterance gets its own KaldiRecognizer.
+    """
+
+    name = "local"
+
+    def __init__(self, model_path=LOCAL_STT_MODEL):
+        self.model_path = model_path
+        self._model = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return vosk is not None and bool(self.model_path) and os.path.isdir(self.model_path)
+
+    def warm(self):
+        with self._lock:
+            if self._model is None:
+                vosk.SetLogLevel(-1)
+                self._model = vosk.Model(self.model_path)
+        return self._model
+
+    def transcribe(self, pcm, rate):
+        rec = vosk.KaldiRecognizer(self.warm(), rate)
+        rec.SetWords(True)
+        rec.AcceptWaveform(bytes(pcm))
+        raw = json.loads(rec.FinalResult())
+        words = raw.get("result") or []
+        confidence = sum(word["conf"] for word in words) / len(words) if words else 0.0
+        return raw.get("text", ""), confidence, raw
+
+
+class RacingBackend(STTBackend):
+    """
+    Runs every engine at once. The first non-empty answer with confidence >=
+    `min_confidence` wins immediately (an engine that gives no confidence
+    counts as confident); if none qualifies, the most confident non-empty
+    answer wins once they are all in. Slower engines finish in the
+    background and still update their counters.
+    """
+
+    name = "race"
+
+    def __init__(self, engines, min_confidence=RACE_MIN_CONFIDENCE):
+        self.engines = engines
+        self.min_confidence = min_confidence
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(engines), thread_name_prefix="stt-race"
+        )
+
+    def warm(self):
+        for engine in self.engines:
+            engine.warm()
+
+    def recognize(self, pcm, rate) -> STTResult:
+        start = time.perf_counter()
+        futures = [self._pool.submit(engine.recognize, pcm, rate) for engine in self.engines]
+        results = []
+        winner = None
+
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=RACE_TIMEOUT):
+                try:
+                    result = future.result()
+                except Exception:
+                    continue
+                results.append(result)
+                if result.text and (result.confidence is None or result.confidence >= self.min_confidence):
+                    winner = result
+                    break
+        except concurrent.futures.TimeoutError:
+            print("STT race: timed out waiting for engines")
+
+        if winner is None:
+            candidates = [result for result in results if result.text]
+            if not candidates:
+                return STTResult("", 0.0, self.name, (time.perf_counter() - start) * 1000.0)
+            winner = max(candidates, key=lambda result: result.confidence or 0.0)
+
+        _stats[winner.engine].wins += 1
+        print(f"STT race: {winner.engine} won in {winner.latency_ms:.0f} ms")
+        for future in futures:
+            future.add_done_callback(lambda done, text=winner.text: _count_agreement(done, text))
+        return winner
+
+
+def _count_agreement(future, winning_text):
+    """
+    Rough accuracy signal without ground truth: how often each engine's
+    answer matches the one we acted on.
+    """
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    if result.text:
+        stats = _stats[result.engine]
+        stats.compared += 1
+        if result.text == winning_text:
+            stats.agreed += 1
+
+# -------------------------
+# COUNTERS
+# -------------------------
+
+class EngineStats:
+    def __init__(self):
+        self.latency_ms = 0.0       # EWMA
+        self.calls = 0
+        self.empty = 0              # answered, but heard nothing
+        self.failures = 0           # errors (network, ...)
+        self.wins = 0               # races won
+        self.compared = 0           # non-empty answers in a race ...
+        self.agreed = 0             # ... that matched the winning text
+
+    def record(self, ms, heard):
+        if self.calls == 0:
+            self.latency_ms = ms
+        else:
+            self.latency_ms += 0.2 * (ms - self.latency_ms)
+        self.calls += 1
+        if not heard:
+            self.empty += 1
+
+    def record_failure(self):
+        self.failures += 1
+
+
+_stats = {}
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def stats_for(backend) -> EngineStats:
+    return _stats.setdefault(backend.name, EngineStats())
+
+
+def get_backend(name) -> STTBackend:
+    with _backends_lock:
+        if not _backends:
+            _backends["google"] = GoogleSTTBackend()
+            _backends["local"] = VoskSTTBackend()
+        return _backends[name]
+
+
+def default_backend() -> STTBackend:
+    """
+    JARVIS_STT_BACKEND=google|local pins one engine, =race runs both. =auto
+    (default) races them when a local model is configured, else uses Google.
+    """
+    if STT_BACKEND in ("google", "local"):
+        return get_backend(STT_BACKEND)
+    local = get_backend("local")
+    if STT_BACKEND == "race" or local.available():
+        if not local.available():
+            print("STT: no local model (JARVIS_VOSK_MODEL), using Google only")
+            return get_backend("google")
+        with _backends_lock:
+            if "race" not in _backends:
+                _backends["race"] = RacingBackend([_backends["google"], local])
+            return _backends["race"]
+    return get_backend("google")
+
+
+def recognize(pcm, rate) -> STTResult:
+    return default_backend().recognize(pcm, rate)
+
+
+def engine_report() -> dict:
+    return {
+        name: {
+            "latency_ms": round(stats.latency_ms, 1),
+            "calls": stats.calls,
+            "empty": stats.empty,
+            "failures": stats.failures,
+            "wins": stats.wins,
+            "agreement": round(stats.agreed / stats.compared, 2) if stats.compared else None,
+        }
+        for name, stats in _stats.items()
+    }
+
+# -------------------------
+# EVENT LOOP (one background loop for every streaming session)
+# -------------------------
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="stt-loop", daemon=True).start()
+        return _loop
+
+# -------------------------
+# STREAMING RECOGNIZER
+# -------------------------
+
+class StreamingRecognizer:
+    """
+    One utterance: feed() PCM from any thread while recording, then finish()
+    for the final text. `partial` always holds the newest hypothesis, and
+    `on_partial(text)` (if given) is called from the loop thread when it changes.
+    """
+
+    def __init__(self, rate: int, url: str = STREAM_URL, on_partial=None):
+        self.rate = rate
+        self.url = url
+        self.on_partial = on_partial
+        self.partial = ""
+        self._segments = []          # finalized pieces of a longer utterance
+        self._eof_sent = False
+        self._final = False          # the server answered our eof with a final result
+        self._loop = _get_loop()
+        self._queue = asyncio.Queue()
+        self._closed = False
+        self._future = asyncio.run_coroutine_threadsafe(self._run(), self._loop)
+
+    def feed(self, pcm):
+        if not self._closed:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, bytes(pcm))
+
+    def finish(self, timeout=STREAM_FINAL_TIMEOUT) -> str:
+        """
+        Signal end of audio and wait for the final transcript. Raises on
+        connection errors or timeout, so the caller can fall back.
+        """
+        self._closed = True
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, None)
+        return self._future.result(timeout)
+
+    def cancel(self):
+        self._closed = True
+        self._future.cancel()
+
+    def text_so_far(self) -> str:
+        return " ".join(self._segments + [self.partial]).strip()
+
+    async def _run(self) -> str:
+        timeout = aiohttp.ClientTimeout(total=None, connect=STREAM_CONNECT_TIMEOUT)
+        async with aiohttp.ClientSession(timeout=timeout) as http:
+            async with http.ws_connect(self.url) as ws:
+                await ws.send_str(json.dumps({"config": {"sample_rate": self.rate}}))
+                receiver = asyncio.create_task(self._receive(ws))
+                try:
+                    while True:
+                        chunk = await self._queue.get()
+                        if chunk is None:
+                            break
+                        await ws.send_bytes(chunk)
+                    # vosk-server matches this exact string, not any JSON with eof set
+                    self._eof_sent = True
+                    await ws.send_str('{"eof" : 1}')
+                    await receiver
+                finally:
+                    receiver.cancel()
+        if not self._final:
+            # the partials alone may be missing the end of the command
+            raise RuntimeError("stream closed before a final result")
+        return " ".join(self._segments).strip()
+
+    async def _receive(self, ws):
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            result = json.loads(msg.data)
+            if "partial" in result:
+                if result["partial"] != self.partial:
+                    self.partial = result["partial"]
+                    if self.on_partial is not None:
+                        self.on_partial(self.text_so_far())
+            elif "text" in result:
+                self.partial = ""
+                if result["text"]:
+                    self._segments.append(result["text"])
+                if self._eof_sent:
+                    self._final = True
+
+
+def streaming_enabled() -> bool:
+    return bool(STREAM_URL)
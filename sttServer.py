@@ -0,0 +1,120 @@
+# -------------------------
+# STAND-IN STREAMING STT SERVER (vosk-server protocol, runs offline)
+# -------------------------
+# Lets the streaming path in sttEngine.py be exercised without a network:
+#
+#   python sttServer.py --model vosk-model-small-en-us-0.15   # real recognition (pip install vosk)
+#   python sttServer.py --script "play faded"                 # canned transcript
+#   python sttServer.py --script-file commands.txt            # one line per utterance, in turn
+#
+# then run Jarvis (or replay.py) with JARVIS_STT_STREAM_URL=ws://localhost:2700
+#
+# Scripted mode reveals the transcript a word at a time as voiced audio comes
+# in, so partial hypotheses behave like a real recognizer's.
+
+import argparse
+import itertools
+import json
+
+import numpy as np
+from aiohttp import web
+
+try:
+    import vosk
+except ImportError:
+    vosk = None
+
+# scripted mode: one more word of the partial per this much voiced audio
+WORD_SECONDS = 0.3
+VOICED_RMS = 200
+
+
+class ScriptedRecognizer:
+    def __init__(self, text, rate):
+        self.words = text.split()
+        self.rate = rate
+        self.voiced = 0
+
+    def accept(self, pcm):
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+        if len(samples) and np.sqrt(np.mean(samples * samples)) > VOICED_RMS:
+            self.voiced += len(samples)
+        shown = min(len(self.words), int(self.voiced / self.rate / WORD_SECONDS))
+        return {"partial": " ".join(self.words[:shown])}
+
+    def final(self):
+        return {"text": " ".join(self.words)}
+
+
+class VoskRecognizer:
+    def __init__(self, model, rate):
+        self.rec = vosk.KaldiRecognizer(model, rate)
+
+    def accept(self, pcm):
+        if self.rec.AcceptWaveform(pcm):
+            return json.loads(self.rec.Result())
+        return json.loads(self.rec.PartialResult())
+
+    def final(self):
+        return json.loads(self.rec.FinalResult())
+
+
+def make_app(new_recognizer):
+    async def handle(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        rate = 16000
+        rec = None
+
+        async for msg in ws:
+            if msg.type == web.WSMsgType.TEXT:
+                data = json.loads(msg.data)
+                if "config" in data:
+                    rate = int(data["config"].get("sample_rate", rate))
+                if data.get("eof"):
+                    if rec is None:
+                        rec = new_recognizer(rate)
+                    await ws.send_str(json.dumps(rec.final()))
+                    break
+            elif msg.type == web.WSMsgType.BINARY:
+                if rec is None:
+                    rec = new_recognizer(rate)
+                await ws.send_str(json.dumps(rec.accept(msg.data)))
+
+        await ws.close()
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/", handle)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline stand-in for a streaming STT server.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--model", help="vosk model directory")
+    group.add_argument("--script", help="transcript to return for every utterance")
+    group.add_argument("--script-file", help="file with one transcript per line, used in turn")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2700)
+    args = parser.parse_args()
+
+    if args.model:
+        if vosk is None:
+            parser.error("--model needs the vosk package (pip install vosk)")
+        model = vosk.Model(args.model)
+        new_recognizer = lambda rate: VoskRecognizer(model, rate)
+    else:
+        if args.script_file:
+            with open(args.script_file) as f:
+                lines = [line.strip() for line in f if line.strip()]
+        else:
+            lines = [args.script]
+        script = itertools.cycle(lines)
+        new_recognizer = lambda rate: ScriptedRecognizer(next(script), rate)
+
+    web.run_app(make_app(new_recognizer), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
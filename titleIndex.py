@@ -0,0 +1,58 @@
+# -------------------------
+# TITLE INDEX (fuzzy lookup of spoken song titles)
+# -------------------------
+# get_close_matches scores the query against every title with difflib. Here
+# titles are indexed by character trigram: a lookup only scores the few
+# titles that share the most trigrams with what was heard, so scoring every
+# STT alternative against the library stays cheap however big it gets.
+
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+SHORTLIST = 8
+
+
+def normalize(text: str) -> str:
+    """
+    "Waka Waka!" and "wakawaka" are the same title to a listener.
+    """
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def trigrams(key: str):
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    def __init__(self, titles):
+        self.source = titles          # lets callers see when the library was reloaded
+        self.titles = list(titles)
+        self._keys = [normalize(title) for title in self.titles]
+        self._exact = {key: title for key, title in zip(self._keys, self.titles)}
+        self._grams = defaultdict(set)
+        for i, key in enumerate(self._keys):
+            for gram in trigrams(key):
+                self._grams[gram].add(i)
+
+    def lookup(self, text: str, cutoff: float = 0.6):
+        """
+        (title, similarity 0..1) of the closest title, or None below `cutoff`.
+        Similarity is difflib's ratio, as get_close_matches uses.
+        """
+        key = normalize(text)
+        if not key:
+            return None
+        if key in self._exact:
+            return self._exact[key], 1.0
+
+        shared = Counter(i for gram in trigrams(key) for i in self._grams.get(gram, ()))
+        shortlist = [i for i, _ in shared.most_common(SHORTLIST)]
+
+        best = None
+        for i in shortlist:
+            score = SequenceMatcher(None, key, self._keys[i]).ratio()
+            if score >= cutoff and (best is None or score > best[1]):
+                best = (self.titles[i], score)
+        return best
@@ -0,0 +1,916 @@
+# -------------------------
+# IMPORTS
+# -------------------------
+
+import asyncio
+import concurrent.futures
+import contextlib
+import io
+import itertools
+import os
+import queue
+import re
+import subprocess
+import tempfile
+import threading
+
+import edge_tts
+from pydub import AudioSegment
+
+try:
+    import miniaudio   # optional: in-process mp3 decode, no ffmpeg spawn
+except ImportError:
+    miniaudio = None
+
+try:
+    import pyttsx3     # optional: offline local voice
+except ImportError:
+    pyttsx3 = None
+
+import audioOutput
+import metrics
+import phraseCache
+
+# -------------------------
+# SETTINGS
+# -------------------------
+
+VOICE = "en-US-AriaNeural"
+
+# Stream audio to the speaker while edge-tts is still sending chunks.
+# Set JARVIS_TTS_STREAMING=0 to go back to download-then-play.
+TTS_STREAMING = os.getenv("JARVIS_TTS_STREAMING", "1") == "1"
+
+# mp3 decoder: "miniaudio" decodes in process, "ffmpeg" goes through pydub's
+# converter binary. "auto" uses miniaudio when it is installed.
+TTS_DECODER = os.getenv("JARVIS_TTS_DECODER", "auto")
+
+# edge-tts always sends 24 kHz mono mp3
+STREAM_RATE = 24000
+STREAM_CHANNELS = 1
+STREAM_SAMPLE_WIDTH = 2
+STREAM_READ_BYTES = 4096
+STREAM_FORMAT = phraseCache.pcm_format(STREAM_RATE, STREAM_CHANNELS, STREAM_SAMPLE_WIDTH)
+
+# Decoded phrases are kept on disk and replayed without touching the network.
+PHRASE_CACHE_ENABLED = os.getenv("JARVIS_TTS_CACHE", "1") == "1"
+phrase_cache = phraseCache.PhraseCache() if PHRASE_CACHE_ENABLED else None
+
+# Background pre-synthesis: how many edge-tts requests may be in flight at once.
+# Kept small so edge-tts doesn't throttle us and the wake-word thread keeps its CPU.
+WARMUP_CONCURRENCY = int(os.getenv("JARVIS_TTS_WARMUP_CONCURRENCY", "2"))
+
+# Max utterances waiting in the worker queue; further say() calls are dropped.
+TTS_QUEUE_MAX = int(os.getenv("JARVIS_TTS_QUEUE_MAX", "32"))
+
+# How many utterances may be synthesized ahead of the one playing.
+TTS_LOOKAHEAD = int(os.getenv("JARVIS_TTS_LOOKAHEAD", "1"))
+
+# Which synthesizer to use: edge | local | hedged | auto (rank by measured latency).
+TTS_BACKEND = os.getenv("JARVIS_TTS_BACKEND", "auto")
+
+# Hedged mode: start the second engine if the first has no audio after this long.
+TTS_HEDGE_MS = float(os.getenv("JARVIS_TTS_HEDGE_MS", "700"))
+
+# Added to a backend's latency score in proportion to its failure rate.
+FAILURE_PENALTY_MS = 2000.0
+
+# Local (pyttsx3) voice: substring of the installed voice name, and words/minute.
+LOCAL_TTS_VOICE = os.getenv("JARVIS_LOCAL_TTS_VOICE", "")
+LOCAL_TTS_RATE = int(os.getenv("JARVIS_LOCAL_TTS_RATE", "185"))
+
+# Shorter sentence pieces are merged with their neighbour before synthesis.
+SENTENCE_MIN_CHARS = int(os.getenv("JARVIS_TTS_SENTENCE_MIN_CHARS", "24"))
+
+# -------------------------
+# SYNTHESIS (text -> PCM chunks in STREAM_FORMAT)
+# -------------------------
+
+_END = object()     # end-of-stream marker in chunk queues
+
+async def _fetch_mp3(text, voice=VOICE) -> bytes:
+    communicate = edge_tts.Communicate(text, voice)
+
+    mp3_bytes = b""
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            mp3_bytes += chunk["data"]
+    return mp3_bytes
+
+
+def _use_miniaudio() -> bool:
+    return miniaudio is not None and TTS_DECODER in ("auto", "miniaudio")
+
+
+def decode_mp3_ffmpeg(mp3_bytes):
+    audio = AudioSegment.from_file(io.BytesIO(mp3_bytes), format="mp3")
+    audio = (
+        audio.set_frame_rate(STREAM_RATE)
+        .set_channels(STREAM_CHANNELS)
+        .set_sample_width(STREAM_SAMPLE_WIDTH)
+    )
+    return audio.raw_data
+
+
+def decode_mp3_miniaudio(mp3_bytes):
+    decoded = miniaudio.decode(
+        mp3_bytes,
+        output_format=miniaudio.SampleFormat.SIGNED16,
+        nchannels=STREAM_CHANNELS,
+        sample_rate=STREAM_RATE,
+    )
+    # view the int16 sample array as bytes - no copy
+    return memoryview(decoded.samples).cast("B")
+
+
+def decode_mp3(mp3_bytes):
+    """
+    Whole mp3 -> PCM in STREAM_FORMAT. In process when miniaudio is available,
+    pydub/ffmpeg otherwise.
+    """
+    if _use_miniaudio():
+        return decode_mp3_miniaudio(mp3_bytes)
+    return decode_mp3_ffmpeg(mp3_bytes)
+
+
+async def _synthesize_buffered(text, voice):
+    """
+    Download everything, decode once, yield it as a single chunk.
+    """
+    mp3_bytes = await _fetch_mp3(text, voice)
+    yield await asyncio.to_thread(decode_mp3, mp3_bytes)
+
+
+def _decoder_args():
+    """
+    ffmpeg: mp3 in on stdin, raw s16le PCM out on stdout.
+    Probing and output buffering are turned down so the first frame comes out
+    as soon as the first mp3 frame goes in.
+    """
+    return [
+        AudioSegment.converter,
+        "-hide_banner", "-loglevel", "error",
+        "-probesize", "32", "-analyzeduration", "0", "-fflags", "nobuffer",
+        "-f", "mp3", "-i", "pipe:0",
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ac", str(STREAM_CHANNELS), "-ar", str(STREAM_RATE),
+        "-flush_packets", "1",
+        "pipe:1",
+    ]
+
+
+async def _synthesize_streaming_ffmpeg(text, voice):
+    """
+    Feed edge-tts chunks into one ffmpeg decoder and yield PCM as it comes out,
+    while later mp3 chunks are still downloading.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *_decoder_args(),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+
+    async def _feed():
+        try:
+            communicate = edge_tts.Communicate(text, voice)
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    proc.stdin.write(chunk["data"])
+                    await proc.stdin.drain()
+        finally:
+            # EOF lets ffmpeg flush the tail and exit
+            proc.stdin.close()
+
+    feeder = asyncio.create_task(_feed())
+    frame_bytes = STREAM_CHANNELS * STREAM_SAMPLE_WIDTH
+    carry = b""
+    try:
+        while True:
+            pcm = await proc.stdout.read(STREAM_READ_BYTES)
+            if not pcm:
+                break
+            # pipe reads are not guaranteed to end on a sample boundary
+            pcm = carry + pcm
+            usable = len(pcm) - (len(pcm) % frame_bytes)
+            carry = pcm[usable:]
+            if not usable:
+                continue
+            yield pcm[:usable]
+
+        await feeder
+        if await proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg decoder exited with {proc.returncode}")
+    finally:
+        if not feeder.done():
+            feeder.cancel()
+        if proc.returncode is None:
+            proc.kill()
+        await proc.wait()
+
+
+class _Mp3ChunkSource(miniaudio.StreamableSource if miniaudio else object):
+    """
+    Lets miniaudio pull mp3 bytes as edge-tts delivers them. read() blocks on
+    the decoder thread until data (or EOF) arrives.
+    """
+
+    def __init__(self):
+        self._chunks = queue.Queue()
+        self._buffer = b""
+        self._eof = False
+
+    def feed(self, data):
+        self._chunks.put(data)
+
+    def close(self):
+        self._chunks.put(None)
+
+    def read(self, num_bytes):
+        while not self._buffer:
+            if self._eof:
+                return b""
+            data = self._chunks.get()
+            if data is None:
+                self._eof = True
+                return b""
+            self._buffer = data
+        out, self._buffer = self._buffer[:num_bytes], self._buffer[num_bytes:]
+        return out
+
+
+async def _synthesize_streaming_miniaudio(text, voice):
+    """
+    Same as the ffmpeg path, but the mp3 is decoded in process on a helper
+    thread into miniaudio's preallocated decode buffer.
+    """
+    loop = asyncio.get_running_loop()
+    decoded = asyncio.Queue()
+    source = _Mp3ChunkSource()
+
+    def _decode():
+        try:
+            frames = miniaudio.stream_any(
+                source,
+                source_format=miniaudio.FileFormat.MP3,
+                output_format=miniaudio.SampleFormat.SIGNED16,
+                nchannels=STREAM_CHANNELS,
+                sample_rate=STREAM_RATE,
+                frames_to_read=STREAM_READ_BYTES // STREAM_SAMPLE_WIDTH,
+            )
+            for samples in frames:
+                loop.call_soon_threadsafe(decoded.put_nowait, memoryview(samples).cast("B"))
+            loop.call_soon_threadsafe(decoded.put_nowait, _END)
+        except Exception as e:
+            loop.call_soon_threadsafe(decoded.put_nowait, e)
+
+    async def _feed():
+        try:
+            communicate = edge_tts.Communicate(text, voice)
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    source.feed(chunk["data"])
+        finally:
+            source.close()
+
+    feeder = asyncio.create_task(_feed())
+    threading.Thread(target=_decode, name="tts-decode", daemon=True).start()
+    try:
+        while True:
+            pcm = await decoded.get()
+            if pcm is _END:
+                break
+            if isinstance(pcm, Exception):
+                raise pcm
+            yield pcm
+
+        await feeder
+    finally:
+        if not feeder.done():
+            feeder.cancel()
+        source.close()
+
+
+# -------------------------
+# TTS BACKENDS
+# -------------------------
+
+class TTSBackend:
+    """
+    A synthesizer: text in, PCM chunks in STREAM_FORMAT out.
+    `voice_id` keys the phrase cache. `expected_first_chunk_ms` is the prior
+    used to rank backends until we have measured them.
+    """
+
+    name = "base"
+    voice_id = ""
+    expected_first_chunk_ms = 1000.0
+
+    def available(self) -> bool:
+        return True
+
+    async def stream(self, text):
+        raise NotImplementedError
+        yield
+
+
+class EdgeTTSBackend(TTSBackend):
+    name = "edge"
+    expected_first_chunk_ms = 400.0
+
+    def __init__(self, voice=VOICE):
+        self.voice = voice
+        self.voice_id = voice
+
+    async def stream(self, text):
+        if TTS_STREAMING and _use_miniaudio():
+            chunks = _synthesize_streaming_miniaudio(text, self.voice)
+        elif TTS_STREAMING:
+            chunks = _synthesize_streaming_ffmpeg(text, self.voice)
+        else:
+            chunks = _synthesize_buffered(text, self.voice)
+        async with contextlib.aclosing(chunks):
+            async for pcm in chunks:
+                yield pcm
+
+
+class LocalTTSBackend(TTSBackend):
+    """
+    Offline CPU voice through pyttsx3 (SAPI5 on Windows, eSpeak on Linux).
+    pyttsx3 is not thread-safe, so every call runs on one dedicated thread.
+    """
+
+    name = "local"
+    expected_first_chunk_ms = 800.0
+
+    def __init__(self, voice_name=LOCAL_TTS_VOICE):
+        self.voice_name = voice_name
+        self.voice_id = f"local:{voice_name or 'default'}:{LOCAL_TTS_RATE}"
+        self._engine = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="tts-local"
+        )
+
+    def available(self) -> bool:
+        return pyttsx3 is not None
+
+    def _make_engine(self):
+        try:
+            import pythoncom   # SAPI5 is COM; this thread needs its own apartment
+            pythoncom.CoInitialize()
+        except ImportError:
+            pass
+
+        engine = pyttsx3.init()
+        if LOCAL_TTS_RATE:
+            engine.setProperty("rate", LOCAL_TTS_RATE)
+        if self.voice_name:
+            for voice in engine.getProperty("voices"):
+                if self.voice_name.lower() in (voice.name or "").lower():
+                    engine.setProperty("voice", voice.id)
+                    break
+        return engine
+
+    def _render(self, text):
+        if self._engine is None:
+            self._engine = self._make_engine()
+
+        fd, path = tempfile.mkstemp(suffix=".wav", prefix="jarvis-tts-")
+        os.close(fd)
+        try:
+            self._engine.save_to_file(text, path)
+            self._engine.runAndWait()
+            samples, rate = audioOutput.load_wav(path)
+        finally:
+            os.remove(path)
+
+        if rate != STREAM_RATE:
+            samples = audioOutput.LinearResampler(rate, STREAM_RATE).process(samples)
+        return samples
+
+    async def stream(self, text):
+        loop = asyncio.get_running_loop()
+        samples = await loop.run_in_executor(self._executor, self._render, text)
+        yield memoryview(samples).cast("B")
+
+
+class HedgedBackend(TTSBackend):
+    """
+    Start `primary`; if it has not produced its first chunk within `deadline_ms`
+    (or fails), start `fallback` too. Whichever delivers first is played and
+    the other one is cancelled.
+    """
+
+    name = "hedged"
+
+    def __init__(self, primary, fallback, deadline_ms=TTS_HEDGE_MS):
+        self.primary = primary
+        self.fallback = fallback
+        self.deadline_ms = deadline_ms
+        self.voice_id = primary.voice_id
+
+    async def stream(self, text, cache=True):
+        if phrase_cache is not None:
+            # a phrase cached in either racer's voice plays at once. Warm-up
+            # renders VOICE, so that one is tried first: otherwise the voice
+            # would flip whenever the latency ranking does
+            for backend in sorted((self.primary, self.fallback), key=lambda b: b.voice_id != VOICE):
+                pcm = phrase_cache.get(text, backend.voice_id, STREAM_FORMAT)
+                if pcm is not None:
+                    yield pcm
+                    return
+
+        racers = {}
+        race_start = metrics.now()
+
+        def _launch(backend):
+            chunks = synthesize(text, backend, cache)
+            racers[asyncio.ensure_future(chunks.__anext__())] = (backend, chunks)
+
+        async def _drop(task, backend, chunks):
+            # a loser whose first chunk did arrive was already timed by synthesize()
+            pending = not task.done()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await chunks.aclose()
+            if pending:
+                # no first chunk by the time the race was decided, counted
+                # from the race's start (the hedge starts late on purpose):
+                # a lower bound, so "auto" learns it is slow, not fast
+                stats_for(backend).record_lower_bound(metrics.since_ms(race_start))
+
+        _launch(self.primary)
+        done, _ = await asyncio.wait(list(racers), timeout=self.deadline_ms / 1000.0)
+        if not done or next(iter(done)).exception() is not None:
+            if not done:
+                print(f"TTS: {self.primary.name} slow, hedging with {self.fallback.name}")
+            _launch(self.fallback)
+
+        winner = None
+        try:
+            while racers and winner is None:
+                done, _ = await asyncio.wait(list(racers), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    backend, chunks = racers.pop(task)
+                    if task.exception() is None:
+                        winner = (backend, chunks, task.result())
+                        break
+                    print(f"TTS {backend.name} failed:", repr(task.exception()))
+                    await chunks.aclose()
+        finally:
+            for task, (backend, chunks) in list(racers.items()):
+                await _drop(task, backend, chunks)
+
+        if winner is None:
+            raise RuntimeError("every TTS backend failed")
+
+        backend, chunks, first = winner
+        stats_for(backend).wins += 1
+        async with contextlib.aclosing(chunks):
+            yield first
+            async for pcm in chunks:
+                yield pcm
+
+# -------------------------
+# BACKEND STATS + SELECTION
+# -------------------------
+
+class BackendStats:
+    def __init__(self, prior_ms):
+        self.first_chunk_ms = prior_ms      # EWMA, starts at the backend's prior
+        self.samples = 0
+        self.failures = 0
+        self.wins = 0                       # hedged races won
+
+    def record_latency(self, ms):
+        if self.samples == 0:
+            self.first_chunk_ms = ms
+        else:
+            self.first_chunk_ms += 0.2 * (ms - self.first_chunk_ms)
+        self.samples += 1
+
+    def record_lower_bound(self, ms):
+        """
+        A cancelled attempt took at least `ms`. Only ever raises the
+        estimate, and doesn't count as a measurement replacing the prior.
+        """
+        if ms > self.first_chunk_ms:
+            if self.samples == 0:
+                self.first_chunk_ms = ms
+            else:
+                self.first_chunk_ms += 0.2 * (ms - self.first_chunk_ms)
+
+    def record_failure(self):
+        self.failures += 1
+
+    def score(self) -> float:
+        """
+        Lower is better: typical first-chunk latency plus a failure penalty.
+        """
+        attempts = self.samples + self.failures
+        failure_rate = self.failures / attempts if attempts else 0.0
+        return self.first_chunk_ms + failure_rate * FAILURE_PENALTY_MS
+
+
+_stats = {}
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def stats_for(backend) -> BackendStats:
+    stats = _stats.get(backend.name)
+    if stats is None:
+        stats = _stats.setdefault(backend.name, BackendStats(backend.expected_first_chunk_ms))
+    return stats
+
+
+def get_backend(name):
+    with _backends_lock:
+        if not _backends:
+            _backends["edge"] = EdgeTTSBackend()
+            _backends["local"] = LocalTTSBackend()
+        return _backends[name]
+
+
+def default_backend() -> TTSBackend:
+    """
+    JARVIS_TTS_BACKEND=edge|local pins one engine, =hedged races edge against
+    local. =auto (default) ranks the available engines by measured latency
+    and failures and hedges the best one with the runner-up.
+    """
+    if TTS_BACKEND in ("edge", "local"):
+        return get_backend(TTS_BACKEND)
+
+    candidates = [get_backend(name) for name in ("edge", "local")]
+    candidates = [backend for backend in candidates if backend.available()]
+    if TTS_BACKEND == "hedged" and len(candidates) == 2:
+        return HedgedBackend(candidates[0], candidates[1])
+
+    candidates.sort(key=lambda backend: stats_for(backend).score())
+    if len(candidates) >= 2:
+        return HedgedBackend(candidates[0], candidates[1])
+    return candidates[0] if candidates else get_backend("edge")
+
+
+def backend_report() -> dict:
+    return {
+        name: {
+            "first_chunk_ms": round(stats.first_chunk_ms, 1),
+            "samples": stats.samples,
+            "failures": stats.failures,
+            "wins": stats.wins,
+            "score": round(stats.score(), 1),
+        }
+        for name, stats in _stats.items()
+    }
+
+# -------------------------
+# SYNTHESIS ENTRY POINT (cache + stats around a backend)
+# -------------------------
+
+async def synthesize(text, backend=None, cache=True):
+    """
+    Async generator of PCM chunks (STREAM_FORMAT) for `text`.
+    Phrase-cache hits are yielded straight from the mmap; misses go to
+    `backend` (default: default_backend()) and are written back unless cache=False.
+    """
+    if backend is None:
+        backend = default_backend()
+    if isinstance(backend, HedgedBackend):
+        # each racer does its own cache lookup / write-back
+        async with contextlib.aclosing(backend.stream(text, cache)) as chunks:
+            async for pcm in chunks:
+                yield pcm
+        return
+
+    if phrase_cache is not None:
+        pcm = phrase_cache.get(text, backend.voice_id, STREAM_FORMAT)
+        if pcm is not None:
+            # no explicit close: the player may still hold slices of it,
+            # the map goes away with its last reference
+            yield pcm
+            return
+
+    collected = None
+    if cache and phrase_cache is not None and phrase_cache.cacheable(text):
+        collected = bytearray()
+
+    stats = stats_for(backend)
+    start = metrics.now()
+    first = True
+    try:
+        async with contextlib.aclosing(backend.stream(text)) as chunks:
+            async for pcm in chunks:
+                if first:
+                    first = False
+                    elapsed = metrics.since_ms(start)
+                    stats.record_latency(elapsed)
+                    metrics.record(f"tts.first_chunk_ms.{backend.name}", elapsed, quiet=True)
+                if collected is not None:
+                    collected += pcm
+                yield pcm
+    except Exception:
+        stats.record_failure()
+        raise
+
+    if collected:
+        phrase_cache.put(text, backend.voice_id, STREAM_FORMAT, collected)
+
+# -------------------------
+# SENTENCE SPLITTING (for pipelined long answers)
+# -------------------------
+
+# words that end in a period without ending the sentence
+_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "st", "vs", "etc", "e.g", "i.e", "no", "approx"}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n+")
+
+
+def split_sentences(text, min_chars=SENTENCE_MIN_CHARS):
+    """
+    Split text at sentence ends and line breaks. Pieces shorter than
+    `min_chars` are glued onto the next one so we don't pay a request
+    for "Yes." on its own.
+    """
+    pieces = []
+    pending = ""
+    for part in _SENTENCE_END.split(text):
+        part = part.strip()
+        if not part:
+            continue
+        pending = f"{pending} {part}" if pending else part
+        last_word = pending.rsplit(None, 1)[-1].rstrip(".").lower()
+        if last_word in _ABBREVIATIONS or len(pending) < min_chars:
+            continue
+        pieces.append(pending)
+        pending = ""
+    if pending:
+        if pieces and len(pending) < min_chars:
+            pieces[-1] = f"{pieces[-1]} {pending}"
+        else:
+            pieces.append(pending)
+    return pieces
+
+# -------------------------
+# TTS WORKER (synthesis thread + player thread, ordered queue)
+# -------------------------
+
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class _Utterance:
+    def __init__(self, text, generation, queued_at, cache, follows):
+        self.text = text
+        self.generation = generation
+        self.queued_at = queued_at
+        self.cache = cache
+        self.follows = follows          # continues the previous sentence of an answer
+        self.chunks = queue.Queue()     # PCM chunks, then _END
+
+
+class TTSWorker:
+    """
+    Speaks utterances one at a time, in priority then arrival order.
+
+    One long-lived thread owns the event loop and synthesizes; a second thread
+    feeds a single "tts" voice on the shared output engine. Synthesis runs one
+    utterance ahead of playback, so the next sentence is ready when the
+    current one ends.
+
+    cancel() drops everything queued and cuts off the utterance being played;
+    flush() only drops what is queued.
+    """
+
+    def __init__(self, backend=None, max_pending=TTS_QUEUE_MAX):
+        self.backend = backend      # None: default_backend() per utterance
+        self._queue = queue.PriorityQueue(maxsize=max_pending)
+        self._ready = queue.Queue(maxsize=max(1, TTS_LOOKAHEAD))
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._generation = 0        # bumped by cancel(); older utterances stop
+        self._pending = 0           # queued + synthesizing + playing
+        self._idle = threading.Event()
+        self._idle.set()
+        self._current = None
+        self._output = None
+        self._voice = None
+        self._threads = []
+        self.loop = None
+
+    def start(self):
+        if not self._threads:
+            self._threads = [
+                threading.Thread(target=self._run, name="tts-worker", daemon=True),
+                threading.Thread(target=self._play, name="tts-player", daemon=True),
+            ]
+            for thread in self._threads:
+                thread.start()
+        return self
+
+    # ----- public API -----
+
+    def say(self, text, priority=PRIORITY_NORMAL, cache=True, follows=False) -> bool:
+        text = text.strip()
+        if not text:
+            return False
+        with self._lock:
+            item = (priority, next(self._seq), self._generation, text, metrics.now(), cache, follows)
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                print("TTS queue full, dropping:", text[:60])
+                return False
+            self._pending += 1
+            self._idle.clear()
+        return True
+
+    def say_sentences(self, text, priority=PRIORITY_NORMAL) -> int:
+        """
+        Queue a long answer sentence by sentence so sentence N+1 is synthesized
+        while sentence N plays. Returns how many pieces were queued.
+        """
+        queued = 0
+        for i, sentence in enumerate(split_sentences(text)):
+            # long answers rarely repeat - keep them out of the phrase cache
+            if self.say(sentence, priority, cache=False, follows=i > 0):
+                queued += 1
+        return queued
+
+    def flush(self) -> int:
+        """
+        Drop every utterance that has not started yet. Returns how many.
+        """
+        dropped = 0
+        with self._lock:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                dropped += 1
+        self._done(dropped)
+        return dropped
+
+    def cancel(self) -> int:
+        """
+        Stop the current utterance and drop everything queued.
+        """
+        with self._lock:
+            self._generation += 1
+        if self._voice is not None:
+            # drop what's already in the mixer too, not just what's queued
+            self._voice.clear()
+        return self.flush()
+
+    def wait_idle(self, timeout=None) -> bool:
+        return self._idle.wait(timeout)
+
+    def is_speaking(self) -> bool:
+        return self._current is not None
+
+    def current_text(self):
+        return self._current
+
+    def _done(self, count=1):
+        with self._lock:
+            self._pending -= count
+            if self._pending == 0:
+                self._idle.set()
+
+    # ----- synthesis thread -----
+
+    def _run(self):
+        # the loop lives as long as the worker; each utterance runs on it in turn
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+        while True:
+            _, _, generation, text, queued_at, cache, follows = self._queue.get()
+            if generation != self._generation:
+                self._done()
+                continue
+
+            utterance = _Utterance(text, generation, queued_at, cache, follows)
+            # blocks while TTS_LOOKAHEAD utterances are already waiting to play
+            self._ready.put(utterance)
+            try:
+                self.loop.run_until_complete(self._synthesize(utterance))
+            except Exception as e:
+                print("TTS error:", e)
+            finally:
+                utterance.chunks.put(_END)
+
+    async def _synthesize(self, utterance):
+        chunks = synthesize(utterance.text, self.backend, utterance.cache)
+        async with contextlib.aclosing(chunks):
+            async for pcm in chunks:
+                if utterance.generation != self._generation:
+                    break
+                utterance.chunks.put(pcm)
+
+    # ----- player thread -----
+
+    def _play(self):
+        self._output = audioOutput.get_output()
+        self._voice = self._output.open_voice(STREAM_RATE, STREAM_CHANNELS, tag="tts")
+        free_since = metrics.now()
+
+        while True:
+            utterance = self._ready.get()
+            self._current = utterance.text
+            try:
+                self._play_utterance(utterance, free_since)
+            except Exception as e:
+                print("TTS playback error:", e)
+            finally:
+                self._current = None
+                free_since = metrics.now()
+                self._done()
+
+    def _play_utterance(self, utterance, free_since):
+        def cancelled():
+            return utterance.generation != self._generation
+
+        first = True
+        end = None
+        while True:
+            pcm = utterance.chunks.get()
+            if pcm is _END:
+                break
+            if cancelled():
+                # let the synthesis side run to its _END without playing anything
+                continue
+            if first:
+                first = False
+                if utterance.follows and utterance.queued_at < free_since:
+                    # silence between two sentences of one answer
+                    metrics.record("tts.sentence_gap_ms", metrics.since_ms(free_since), quiet=True)
+                else:
+                    metrics.record("tts.time_to_first_audio_ms", metrics.since_ms(utterance.queued_at))
+            end = self._voice.feed(pcm)
+
+        if end is None:
+            return
+        # Move on a couple of blocks before the tail has played, so the next
+        # utterance is already queued behind it in the mixer - no gap.
+        lead = self._output.frames_per_buffer * 2
+        while not cancelled():
+            if self._voice.wait_played(end - lead, timeout=0.1):
+                break
+
+# -------------------------
+# PRE-SYNTHESIS (fill the phrase cache in the background)
+# -------------------------
+
+async def synthesize_to_cache(text, voice=VOICE) -> bool:
+    """
+    Synthesize `text` into the phrase cache without playing it.
+    Returns False if it was already cached.
+    """
+    if phrase_cache.contains(text, voice, STREAM_FORMAT):
+        return False
+    mp3_bytes = await _fetch_mp3(text, voice)
+    raw = await asyncio.to_thread(decode_mp3, mp3_bytes)
+    phrase_cache.put(text, voice, STREAM_FORMAT, raw)
+    return True
+
+
+async def _warm(texts, voice, limit):
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _one(text):
+        async with semaphore:
+            try:
+                await synthesize_to_cache(text, voice)
+            except Exception as e:
+                print(f"TTS warm-up failed for {text!r}:", e)
+
+    await asyncio.gather(*(_one(text) for text in texts))
+
+
+def warm_cache(texts, voice=VOICE, limit=WARMUP_CONCURRENCY):
+    """
+    Pre-render every phrase in `texts` that is not cached yet, on a background
+    thread with at most `limit` synthesis requests in flight.
+    Returns the thread, or None if there was nothing to do.
+    """
+    if phrase_cache is None:
+        return None
+
+    pending = [
+        text for text in dict.fromkeys(texts)
+        if phrase_cache.cacheable(text) and not phrase_cache.contains(text, voice, STREAM_FORMAT)
+    ]
+    if not pending:
+        return None
+
+    def _run():
+        start = metrics.now()
+        asyncio.run(_warm(pending, voice, max(1, limit)))
+        print(f"TTS warm-up: {len(pending)} phrases in {metrics.since_ms(start):.0f} ms")
+
+    thread = threading.Thread(target=_run, daemon=True)
+    thread.start()
+    return thread
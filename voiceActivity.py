@@ -0,0 +1,302 @@
+# -------------------------
+# VOICE ACTIVITY (noise floor, per-frame speech features)
+# -------------------------
+# Cheap, vectorized measurements over the capture frames the wake-word loop
+# is already reading, so nothing here needs its own pass over the microphone.
+
+import math
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+# -------------------------
+# SETTINGS
+# -------------------------
+
+# How much recent audio the noise floor is estimated over, and which
+# percentile of frame energy counts as "the room" (speech is the loud tail).
+NOISE_WINDOW_SECONDS = float(os.getenv("JARVIS_NOISE_WINDOW_SECONDS", "10"))
+NOISE_PERCENTILE = float(os.getenv("JARVIS_NOISE_PERCENTILE", "20"))
+
+# speech threshold = floor * ratio, never below the minimum
+NOISE_RATIO = float(os.getenv("JARVIS_NOISE_RATIO", "2.5"))
+MIN_ENERGY_THRESHOLD = float(os.getenv("JARVIS_MIN_ENERGY", "120"))
+
+# Endpointing: how long a trailing silence ends the command. The hangover
+# starts at the default, then follows the speaker's own pauses (scaled by
+# PACE) inside these bounds.
+HANGOVER_SECONDS = float(os.getenv("JARVIS_HANGOVER_SECONDS", "0.7"))
+HANGOVER_MIN_SECONDS = float(os.getenv("JARVIS_HANGOVER_MIN_SECONDS", "0.3"))
+HANGOVER_MAX_SECONDS = float(os.getenv("JARVIS_HANGOVER_MAX_SECONDS", "1.5"))
+HANGOVER_PACE = 1.6
+
+# less speech than this so far ("play...") is probably not the whole command
+SHORT_UTTERANCE_SECONDS = 0.5
+
+ONSET_SECONDS = 0.08            # this much speech in a row starts the command
+LEAD_IN_SECONDS = 0.3           # audio kept from before the onset
+LISTEN_TIMEOUT = float(os.getenv("JARVIS_LISTEN_TIMEOUT", "6"))
+PHRASE_TIME_LIMIT = float(os.getenv("JARVIS_PHRASE_TIME_LIMIT", "12"))
+
+# Wake-word pre-gate: Porcupine only runs on frames that look like speech
+# (a lower bar than command endpointing), plus a look-back so the start of
+# the keyword is never clipped, and a hold so the end isn't either.
+GATE_ENABLED = os.getenv("JARVIS_WAKE_GATE", "1") == "1"
+GATE_RATIO = float(os.getenv("JARVIS_WAKE_GATE_RATIO", "1.5"))
+GATE_MIN_ENERGY = float(os.getenv("JARVIS_WAKE_GATE_MIN_ENERGY", "60"))
+GATE_LOOKBACK_SECONDS = float(os.getenv("JARVIS_WAKE_GATE_LOOKBACK", "0.3"))
+GATE_HOLD_SECONDS = 1.0
+
+# fraction of sign changes per sample above which a loud frame is hiss, not voice
+MAX_SPEECH_ZCR = 0.45
+
+# -------------------------
+# NOISE FLOOR
+# -------------------------
+
+class NoiseFloorTracker:
+    """
+    Running low-percentile of frame RMS over the last few seconds.
+
+    update() is O(1) (one store into a preallocated array); the percentile
+    is recomputed about once a second with np.partition, so the threshold is
+    always current without a calibration pause before each command.
+    """
+
+    def __init__(self, frames_per_second: float, window_seconds=NOISE_WINDOW_SECONDS,
+                 percentile=NOISE_PERCENTILE):
+        self.size = max(8, int(frames_per_second * window_seconds))
+        self.every = max(1, int(frames_per_second))
+        self.percentile = percentile
+        self._rms = np.zeros(self.size, dtype=np.float32)
+        self._count = 0
+        self.floor = 0.0
+
+    def update(self, rms: float):
+        self._rms[self._count % self.size] = rms
+        self._count += 1
+        if self._count % self.every == 0:
+            self._recompute()
+
+    def _recompute(self):
+        values = self._rms[:min(self._count, self.size)]
+        k = int((len(values) - 1) * self.percentile / 100.0)
+        self.floor = float(np.partition(values, k)[k])
+
+    def ready(self) -> bool:
+        return self._count >= self.every
+
+    def threshold(self, ratio=NOISE_RATIO, minimum=MIN_ENERGY_THRESHOLD) -> float:
+        """
+        Energy level that counts as speech over the current floor.
+        """
+        return max(minimum, self.floor * ratio)
+
+# -------------------------
+# FRAME FEATURES
+# -------------------------
+
+def frame_features(frame: np.ndarray):
+    """
+    (rms, zero-crossing rate) of one int16 frame.
+    """
+    rms = math.sqrt(np.einsum("i,i->", frame, frame, dtype=np.int64) / len(frame))
+    signs = np.signbit(frame)
+    zcr = np.count_nonzero(signs[1:] != signs[:-1]) / len(frame)
+    return rms, zcr
+
+
+def is_speech(rms, zcr, threshold) -> bool:
+    return rms > threshold and zcr < MAX_SPEECH_ZCR
+
+# -------------------------
+# WAKE-WORD GATE
+# -------------------------
+
+class SpeechGate:
+    """
+    Decides, per frame, how many frames the keyword engine should see.
+    """
+
+    def __init__(self, frames_per_second: float, lookback_seconds=GATE_LOOKBACK_SECONDS,
+                 hold_seconds=GATE_HOLD_SECONDS):
+        self.lookback = int(round(lookback_seconds * frames_per_second))
+        self.hold = max(1, int(round(hold_seconds * frames_per_second)))
+        self._open_for = 0        # frames left before the gate closes
+        self._closed_run = 0      # frames skipped since it last closed
+        self.seen = 0
+        self.passed = 0
+
+    def update(self, rms, zcr, threshold) -> int:
+        """
+        Returns how many frames, ending with this one, to run the engine on:
+        0 while closed, 1 while open, and the look-back plus this frame at
+        the moment it opens (never frames the engine has already seen).
+        """
+        self.seen += 1
+        if is_speech(rms, zcr, threshold):
+            count = 1 if self._open_for else min(self.lookback, self._closed_run) + 1
+            self._open_for = self.hold
+        elif self._open_for:
+            self._open_for -= 1
+            count = 1
+        else:
+            self._closed_run += 1
+            return 0
+
+        self._closed_run = 0
+        self.passed += count
+        return count
+
+    def duty(self) -> float:
+        """
+        Share of frames the engine actually ran on.
+        """
+        return self.passed / self.seen if self.seen else 0.0
+
+# -------------------------
+# ENDPOINTER
+# -------------------------
+
+class NoSpeechTimeout(Exception):
+    pass
+
+
+class Utterance:
+    def __init__(self, pcm, rate, speech_end, hangover, ended_at):
+        self.pcm = pcm                  # s16le mono bytes
+        self.rate = rate
+        self.speech_end = speech_end    # time.monotonic() of the last speech frame
+        self.hangover = hangover        # trailing silence that ended it (seconds of audio)
+        self.ended_at = ended_at        # time.monotonic() of the frame that ended it
+
+    def latency_ms(self) -> float:
+        """
+        End of speech -> now: the hangover in audio time plus the time since
+        the last frame arrived. A replayed file writes frames as fast as
+        they are read, so wall time since speech_end would leave the
+        hangover out.
+        """
+        return (self.hangover + time.monotonic() - self.ended_at) * 1000.0
+
+    @property
+    def seconds(self) -> float:
+        return len(self.pcm) / 2 / self.rate
+
+
+class Endpointer:
+    """
+    Records one command from a capture ring reader and decides when it's over.
+
+    Works in frame counts, not wall time, so it behaves the same on a live
+    microphone and on a replayed file. The silence needed to end the command
+    adapts to the pauses the speaker has made so far, and is stretched while
+    the command is still very short. `looks_complete`, if given, is called
+    with no arguments at each pause (e.g. to check a partial transcript) and
+    can return True / False to shorten / stretch the wait, or None.
+    """
+
+    def __init__(self, rate: int, frame_length: int, threshold: float, looks_complete=None):
+        self.rate = rate
+        self.frame_length = frame_length
+        self.threshold = threshold
+        self.looks_complete = looks_complete
+
+    def _frames(self, seconds: float) -> int:
+        return max(1, int(round(seconds * self.rate / self.frame_length)))
+
+    def _hangover_frames(self, pauses, spoken) -> int:
+        if pauses:
+            # a bit longer than the longest pause the speaker has already made
+            frames = int(max(pauses) * HANGOVER_PACE)
+        else:
+            frames = self._frames(HANGOVER_SECONDS)
+        frames = min(max(frames, self._frames(HANGOVER_MIN_SECONDS)),
+                     self._frames(HANGOVER_MAX_SECONDS))
+
+        verdict = self.looks_complete() if self.looks_complete is not None else None
+        if verdict is None and spoken < self._frames(SHORT_UTTERANCE_SECONDS):
+            verdict = False
+        if verdict is True:
+            frames = max(self._frames(HANGOVER_MIN_SECONDS), frames // 2)
+        elif verdict is False:
+            frames = min(self._frames(HANGOVER_MAX_SECONDS), frames * 3 // 2)
+        return frames
+
+    def record(self, reader, timeout=LISTEN_TIMEOUT, phrase_time_limit=PHRASE_TIME_LIMIT,
+               on_audio=None, muted=None) -> Utterance:
+        """
+        `on_audio(pcm)`, if given, gets every chunk of the command as soon as
+        it is captured (lead-in first), e.g. to stream it to a recognizer.
+        `muted(stamp)`, if given, is asked about each frame's capture time;
+        frames it rejects (e.g. our own chime) count as silence, are sent
+        on as silence, and don't use up the listen timeout.
+        """
+        silent_frame = np.zeros(self.frame_length, dtype=np.int16)
+
+        def next_frame():
+            frame = reader.read()
+            if muted is not None and muted(reader.ring.stamp(reader.position - 1)):
+                return silent_frame, True
+            return frame, False
+
+        onset = self._frames(ONSET_SECONDS)
+        lead_in = deque(maxlen=self._frames(LEAD_IN_SECONDS) + onset)
+        wait_limit = self._frames(timeout) if timeout else None
+        phrase_limit = self._frames(phrase_time_limit) if phrase_time_limit else None
+
+        # ----- wait for speech onset -----
+        run = 0
+        waited = 0
+        while run < onset:
+            frame, skipped = next_frame()
+            rms, zcr = frame_features(frame)
+            lead_in.append(frame.tobytes())
+            run = run + 1 if is_speech(rms, zcr, self.threshold) else 0
+            if not skipped:
+                waited += 1
+            if wait_limit is not None and waited >= wait_limit:
+                raise NoSpeechTimeout(f"no speech within {timeout:.1f} s")
+
+        # ----- record until the hangover runs out -----
+        chunks = list(lead_in)
+        if on_audio is not None:
+            for chunk in chunks:
+                on_audio(chunk)
+        speech_end_at = len(chunks)
+        speech_end = reader.ring.stamp(reader.position - 1)
+        silence = 0
+        pauses = []
+        spoken = run
+        hangover = self._hangover_frames(pauses, spoken)
+
+        while silence < hangover:
+            frame, _ = next_frame()
+            chunks.append(frame.tobytes())
+            if on_audio is not None:
+                on_audio(chunks[-1])
+            rms, zcr = frame_features(frame)
+
+            if is_speech(rms, zcr, self.threshold):
+                if silence >= onset:
+                    pauses.append(silence)
+                silence = 0
+                spoken += 1
+                speech_end_at = len(chunks)
+                speech_end = reader.ring.stamp(reader.position - 1)
+            else:
+                silence += 1
+                if silence == 1:
+                    hangover = self._hangover_frames(pauses, spoken)
+
+            if phrase_limit is not None and len(chunks) >= phrase_limit:
+                break
+
+        # keep a couple of frames of the tail so the last consonant isn't clipped
+        pcm = b"".join(chunks[:speech_end_at + 2])
+        return Utterance(
+            pcm, self.rate, speech_end, silence * self.frame_length / self.rate,
+            reader.ring.stamp(reader.position - 1),
+        )
@@ -0,0 +1,116 @@
+# -------------------------
+# WAKE-WORD PROCESS (capture + Porcupine outside the main interpreter)
+# -------------------------
+# A heavy mp3 decode or a big response.json() in the main process holds the
+# GIL long enough to make the wake loop miss frames. In this mode the
+# microphone callback, the speech gate and Porcupine run in their own
+# process: audio goes into a shared-memory FrameRing (so STT in the main
+# process still reads the same frames, pre-roll included) and detections
+# come back over a pipe as the ring position after the keyword.
+
+import multiprocessing
+import os
+from multiprocessing import resource_tracker
+
+import audioCapture
+import metrics
+import voiceActivity
+
+# a fresh interpreter on every OS: a forked child would inherit the main
+# process's threads, locks and PortAudio state mid-flight
+_context = multiprocessing.get_context("spawn")
+
+
+def _run(conn, access_key, keywords, ring_seconds):
+    import pvporcupine
+
+    # the only Porcupine instance in this mode; its audio format sizes the
+    # ring, which the main process then attaches to by name
+    porcupine = pvporcupine.create(access_key=access_key, keywords=keywords)
+    rate, frame_length = porcupine.sample_rate, porcupine.frame_length
+    capacity = audioCapture.ring_capacity(rate, frame_length, ring_seconds)
+    ring = audioCapture.SharedFrameRing(frame_length, capacity)
+    capture = audioCapture.MicrophoneCapture(rate, frame_length, ring=ring).start()
+    reader = ring.reader()
+
+    frames_per_second = rate / frame_length
+    noise_floor = voiceActivity.NoiseFloorTracker(frames_per_second)
+    gate = voiceActivity.SpeechGate(frames_per_second)
+    cpu = metrics.CpuMeter("wake.cpu_per_audio_hour")
+    conn.send(("ready", ring.name, rate, frame_length, capacity))
+
+    try:
+        while not conn.poll():
+            frame = reader.read(timeout=0.5)
+            if frame is None:
+                continue
+
+            rms, zcr = voiceActivity.frame_features(frame)
+            noise_floor.update(rms)
+            if voiceActivity.GATE_ENABLED:
+                threshold = noise_floor.threshold(voiceActivity.GATE_RATIO, voiceActivity.GATE_MIN_ENERGY)
+                feed = gate.update(rms, zcr, threshold)
+            else:
+                feed = 1
+
+            for position in range(reader.position - feed, reader.position):
+                if audioCapture.porcupine_process(porcupine, ring.frame(position)) >= 0:
+                    conn.send(("wake", reader.position))
+                    break
+
+            if cpu.add_audio(1.0 / frames_per_second) and voiceActivity.GATE_ENABLED:
+                metrics.record("wake.gate_open_pct", gate.duty() * 100.0, unit="%")
+            capture.check_overflows()
+    finally:
+        capture.close()
+        porcupine.delete()
+        ring.close()
+
+
+class WakeProcess(audioCapture.CaptureSource):
+    """
+    Capture source whose ring is filled by the wake-word process. Readers in
+    this process poll the shared ring; detections arrive via poll_detection().
+    The process is started here: rate and frame length are Porcupine's, and
+    only the child creates a Porcupine engine.
+    """
+
+    def __init__(self, access_key, keywords, ring_seconds=audioCapture.RING_SECONDS):
+        self._conn, child_conn = _context.Pipe()
+        self.process = _context.Process(
+            target=_run,
+            args=(child_conn, access_key, list(keywords), ring_seconds),
+            name="jarvis-wake",
+            daemon=True,
+        )
+        if os.name == "posix":
+            # the child creates the ring and is handed our tracker, so it
+            # shares it, and close(unlink=True) here is the only cleanup
+            resource_tracker.ensure_running()
+        self.process.start()
+        # our copy of the child's end, closed so a crash shows up as EOF here
+        child_conn.close()
+        try:
+            _, ring_name, rate, frame_length, capacity = self._conn.recv()   # porcupine + mic up
+        except EOFError:
+            raise RuntimeError("wake-word process exited during startup") from None
+        print(f"Wake-word process running (pid {self.process.pid})")
+        super().__init__(rate, frame_length, audioCapture.SharedFrameRing(frame_length, capacity, name=ring_name))
+
+    def poll_detection(self, since=0):
+        """
+        Ring position just after the newest keyword detected at or after
+        `since`, or None. Older detections (e.g. during STT) are dropped.
+        """
+        detected = None
+        while self._conn.poll():
+            kind, position = self._conn.recv()
+            if kind == "wake" and position >= since:
+                detected = position
+        return detected
+
+    def close(self):
+        if self.process.is_alive():
+            self._conn.send("stop")
+            self.process.join(timeout=2)
+        self.ring.close(unlink=True)